@@ -1,8 +1,19 @@
 
 
-export async function loadMetroData() {
-  const response = await fetch("/Server/Data/merged_data.json");
-  return await response.json();
+// fetched once per page load; the server answers with an ETag,
+// so a reload only revalidates it (304)
+let metroData = null;
+
+export function loadMetroData() {
+  if (!metroData) {
+    metroData = fetch("http://127.0.0.1:5000/network")
+      .then((response) => {
+        if (!response.ok) throw new Error("Failed to fetch station data");
+        return response.json();
+      })
+      .then((body) => body.data);
+  }
+  return metroData;
 }
 
 export function buildElements(data) {
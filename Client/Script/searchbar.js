@@ -1,66 +1,51 @@
 const searchInput = document.getElementById("search");
 const stationList = document.getElementById("stationList");
 
-let stations = [];
-let lines = [];
+// number of the latest request: answers to older ones are ignored
+let lastRequest = 0;
 
-// Initialize data on page load
-initializeData();
 searchInput.addEventListener("input", onSearchInput);
 
-/**
- * Loads station data from the server and stores it locally.
- */
-async function initializeData() {
-  try {
-    const data = await fetchMetroData();
-    stations = data.stations || [];
-    lines = data.lines || [];
-    console.log("Stations and lines loaded:", stations, lines);
-  } catch (error) {
-    console.error("Error initializing metro data:", error);
-    alert("Failed to load metro data. Please try again later.");
-  }
-}
-
-/**
- * Fetches the merged data from the server.
- * @returns {Promise<Object>} The JSON containing stations and lines.
- */
-async function fetchMetroData() {
-  const response = await fetch("/Server/Data/merged_data.json");
-  if (!response.ok) throw new Error("Failed to fetch station data");
-  return response.json();
-}
-
 /**
  * Handler for search input change events.
  * @param {Event} event The input event from the search field.
  */
-function onSearchInput(event) {
+async function onSearchInput(event) {
   const query = event.target.value;
-  const filteredStations = filterStations(query);
-  updateSearchResults(filteredStations);
+  const request = ++lastRequest;
+
+  if (query.trim() === "") {
+    stationList.innerHTML = "";
+    return;
+  }
+
+  try {
+    const results = await searchStations(query);
+    if (request === lastRequest) {
+      updateSearchResults(results);
+    }
+  } catch (error) {
+    console.error("Error searching stations:", error);
+  }
 }
 
 /**
- * Filters stations by query matching station name or line.
+ * Asks the server for the stations matching the query (name prefix, accents ignored, or line number).
  * @param {string} query The search query from the user.
- * @returns {Array} List of stations that match the query.
+ * @returns {Promise<Array>} Matching stations, one entry per name with its lines.
  */
-function filterStations(query) {
-  const lowerQuery = query.toLowerCase().trim();
-
-  return stations.filter(
-    (station) =>
-      station.name.toLowerCase().includes(lowerQuery) ||
-      station.ligne.toLowerCase().includes(lowerQuery)
+async function searchStations(query) {
+  const response = await fetch(
+    `http://127.0.0.1:5000/search?q=${encodeURIComponent(query)}&limit=20`
   );
+  if (!response.ok) throw new Error("Failed to search stations");
+  const body = await response.json();
+  return body.data || [];
 }
 
 /**
  * Updates the displayed station list based on search results.
- * @param {Array} results The filtered list of stations.
+ * @param {Array} results The list of matching stations.
  */
 function updateSearchResults(results) {
   stationList.innerHTML = "";
@@ -72,7 +57,7 @@ function updateSearchResults(results) {
 
   results.forEach((station) => {
     const stationItem = document.createElement("li");
-    stationItem.textContent = `${station.name} (Line ${station.ligne})`;
+    stationItem.textContent = `${station.name} (Line ${station.lignes.join(", ")})`;
     stationList.appendChild(stationItem);
   });
 }
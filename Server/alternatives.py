@@ -0,0 +1,167 @@
+import heapq
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graphe import Graphe
+
+# k plus courts chemins sans boucle (Yen) pour /dijkstra/alternatives.
+# Un chemin est une liste d'index de stations, du départ à l'arrivée.
+
+INFINI = float("inf")
+
+
+class Budget:
+    # nombre de stations que les recherches d'une même requête peuvent encore traiter
+    def __init__(self, travail: int):
+        self.restant = travail
+
+    def consommer(self, quantite: int = 1) -> bool:
+        self.restant -= quantite
+        return self.restant >= 0
+
+    @property
+    def epuise(self) -> bool:
+        return self.restant < 0
+
+
+def poids_arc(graphe: "Graphe", index: int, index_voisin: int) -> float:
+    # plus petit poids entre deux stations voisines
+    poids = INFINI
+    for k in range(graphe.debut_voisins[index], graphe.debut_voisins[index + 1]):
+        if graphe.voisins[k] == index_voisin and graphe.poids[k] < poids:
+            poids = graphe.poids[k]
+    return poids
+
+
+def temps_cumules(graphe: "Graphe", chemin: List[int]) -> List[float]:
+    cumul = [0]
+    for index, index_voisin in zip(chemin, chemin[1:]):
+        cumul.append(cumul[-1] + poids_arc(graphe, index, index_voisin))
+    return cumul
+
+
+def chemin_restreint(graphe: "Graphe", index_depart: int, index_arrivee: int, temps_vers: List[float],
+                     suivant: List[int], stations_exclues: Set[int], arcs_exclus: Set[Tuple[int, int]],
+                     budget: Budget) -> Optional[Tuple[float, List[int]]]:
+    # Plus court chemin sans stations_exclues ni arcs_exclus, None s'il n'y en a pas ou si le budget est épuisé.
+    # L'arbre des plus courts chemins vers l'arrivée (temps_vers, suivant) sert deux fois : si son chemin
+    # n'emprunte rien d'exclu, c'est la réponse sans recherche ; sinon il donne une heuristique A* exacte
+    # sur le graphe complet, qui reste admissible une fois des stations et des arcs retirés.
+    if temps_vers[index_depart] == INFINI:
+        return None
+    chemin = [index_depart]
+    current = index_depart
+    while current != index_arrivee:
+        index_suivant = suivant[current]
+        if index_suivant in stations_exclues or (current, index_suivant) in arcs_exclus:
+            break
+        chemin.append(index_suivant)
+        current = index_suivant
+    else:
+        return temps_vers[index_depart], chemin
+
+    temps: Dict[int, float] = {index_depart: 0}
+    precedent: Dict[int, int] = {index_depart: -1}
+    traitees: Set[int] = set()
+    tas: List[Tuple[float, float, int]] = [(temps_vers[index_depart], 0, index_depart)]
+    while tas:
+        _, temps_current, current = heapq.heappop(tas)
+        if current in traitees:
+            continue
+        if not budget.consommer():
+            return None
+        traitees.add(current)
+        if current == index_arrivee:
+            chemin = [current]
+            while precedent[current] != -1:
+                current = precedent[current]
+                chemin.append(current)
+            chemin.reverse()
+            return temps_current, chemin
+        for k in range(graphe.debut_voisins[current], graphe.debut_voisins[current + 1]):
+            index_voisin = graphe.voisins[k]
+            if (index_voisin in traitees or index_voisin in stations_exclues
+                    or (current, index_voisin) in arcs_exclus or temps_vers[index_voisin] == INFINI):
+                continue
+            nouveau_temps = temps_current + graphe.poids[k]
+            if nouveau_temps < temps.get(index_voisin, INFINI):
+                temps[index_voisin] = nouveau_temps
+                precedent[index_voisin] = current
+                heapq.heappush(tas, (nouveau_temps + temps_vers[index_voisin], nouveau_temps, index_voisin))
+    return None
+
+
+def aretes_en_rame(graphe: "Graphe", chemin: List[int]) -> Dict[Tuple[int, int], float]:
+    # arêtes parcourues en rame (stations d'une même ligne) -> poids ; les couloirs de correspondance sont ignorés
+    aretes = {}
+    for a, b in zip(chemin, chemin[1:]):
+        if graphe.stations[a].lignes.keys() & graphe.stations[b].lignes.keys():
+            aretes[(min(a, b), max(a, b))] = poids_arc(graphe, a, b)
+    return aretes
+
+
+def recouvrement(graphe: "Graphe", chemin: List[int], autre: List[int]) -> float:
+    # part du temps en rame de chemin passée sur des arêtes qu'autre parcourt aussi en rame : deux chemins qui
+    # ne diffèrent que par les couloirs empruntés dans une station de correspondance valent 1
+    aretes = aretes_en_rame(graphe, chemin)
+    aretes_autre = aretes_en_rame(graphe, autre)
+    total = sum(aretes.values())
+    if total == 0:
+        return 1.0
+    return sum(poids for arete, poids in aretes.items() if arete in aretes_autre) / total
+
+
+def k_plus_courts_chemins(graphe: "Graphe", index_depart: int, index_arrivee: int, k: int, travail: int,
+                          recouvrement_max: float) -> Tuple[List[Tuple[float, List[int]]], bool]:
+    # Yen : jusqu'à k chemins (temps, chemin) par temps croissant, sans ceux qui passent plus de recouvrement_max
+    # de leur temps sur les arêtes d'un chemin déjà retenu. travail borne le nombre de stations traitées par
+    # l'ensemble des recherches ; le booléen vaut False si ce budget a arrêté la recherche avant k chemins.
+    budget = Budget(travail)
+    # graphe non orienté : l'arbre depuis l'arrivée donne, pour chaque station, le temps et la station suivante vers elle
+    temps_vers, suivant = graphe.plus_courts_chemins(index_arrivee)
+    budget.consommer(graphe.nombre_stations())
+    premier = chemin_restreint(graphe, index_depart, index_arrivee, temps_vers, suivant, set(), set(), budget)
+    if premier is None:
+        return [], not budget.epuise
+
+    # trouves : chemins successifs de Yen, y compris ceux écartés comme trop proches (ils guident la suite)
+    trouves: List[Tuple[float, List[int]]] = [premier]
+    retenus: List[Tuple[float, List[int]]] = [premier]
+    candidats: List[Tuple[float, int, List[int]]] = []
+    deja_vus = {tuple(premier[1])}
+    nb_candidats = 0
+    while len(retenus) < k:
+        dernier = trouves[-1][1]
+        cumul = temps_cumules(graphe, dernier)
+        for i in range(len(dernier) - 1):
+            # déviation à partir de la i-ème station : même début, puis un arc que les chemins de même début n'ont pas pris
+            racine = dernier[:i + 1]
+            arcs_exclus = {(chemin[i], chemin[i + 1]) for _, chemin in trouves if chemin[:i + 1] == racine}
+            deviation = chemin_restreint(graphe, dernier[i], index_arrivee, temps_vers, suivant,
+                                         set(racine[:-1]), arcs_exclus, budget)
+            if budget.epuise:
+                break
+            if deviation is None:
+                continue
+            chemin = racine[:-1] + deviation[1]
+            if tuple(chemin) in deja_vus:
+                continue
+            deja_vus.add(tuple(chemin))
+            nb_candidats += 1
+            heapq.heappush(candidats, (cumul[i] + deviation[0], nb_candidats, chemin))
+        if budget.epuise or not candidats:
+            break
+        temps, _, chemin = heapq.heappop(candidats)
+        trouves.append((temps, chemin))
+        if all(recouvrement(graphe, chemin, autre) <= recouvrement_max for _, autre in retenus):
+            retenus.append((temps, chemin))
+    return retenus, not budget.epuise
+
+
+def chaine_depuis_chemin(graphe: "Graphe", chemin: List[int]) -> Dict[int, Tuple[int, int]]:
+    # même format que dijkstra() : id station -> (id provenance, temps depuis le départ)
+    cumul = temps_cumules(graphe, chemin)
+    return {
+        graphe.ids[chemin[j]]: (graphe.ids[chemin[j - 1]], cumul[j])
+        for j in range(1, len(chemin))
+    }
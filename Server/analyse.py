@@ -0,0 +1,206 @@
+import atexit
+import heapq
+import multiprocessing
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graphe import Graphe
+
+# Analyses du réseau servies sous /analysis, calculées une fois par version du graphe (cache dans graphe.py).
+
+INFINI = float("inf")
+# sources par tâche envoyée aux processus : assez pour amortir l'envoi du résultat partiel (n flottants)
+SOURCES_PAR_TACHE = 64
+# en-tête de la mémoire partagée : nombre de stations, nombre d'arcs
+EN_TETE_PARTAGE = struct.Struct("<II")
+
+
+def elements_critiques(graphe: "Graphe") -> Tuple[List[int], List[Tuple[int, int]]]:
+    # Tarjan en un parcours en profondeur itératif, O(stations + arcs), graphe vu comme non orienté :
+    #   points d'articulation : index des stations dont la fermeture coupe une composante en plusieurs
+    #   ponts : (index, index voisin) des arêtes dont la fermeture coupe une composante en deux
+    # Deux arêtes entre les mêmes stations ne sont pas des ponts : seul l'arc vers le parent est ignoré, une fois.
+    n = graphe.nombre_stations()
+    debut_voisins, voisins = graphe.debut_voisins, graphe.voisins
+    # ordre de découverte, plus petit ordre atteignable par un arc de retour depuis le sous-arbre
+    decouverte = [-1] * n
+    bas = [0] * n
+    parent = [-1] * n
+    # prochain arc à examiner, arc vers le parent déjà ignoré
+    prochain = [0] * n
+    parent_ignore = bytearray(n)
+    articulations = bytearray(n)
+    ponts: List[Tuple[int, int]] = []
+    compteur = 0
+
+    for racine in range(n):
+        if decouverte[racine] != -1:
+            continue
+        decouverte[racine] = bas[racine] = compteur
+        compteur += 1
+        prochain[racine] = debut_voisins[racine]
+        enfants_racine = 0
+        pile = [racine]
+        while pile:
+            current = pile[-1]
+            if prochain[current] < debut_voisins[current + 1]:
+                voisin = voisins[prochain[current]]
+                prochain[current] += 1
+                if voisin == parent[current] and not parent_ignore[current]:
+                    parent_ignore[current] = 1
+                elif decouverte[voisin] == -1:
+                    parent[voisin] = current
+                    decouverte[voisin] = bas[voisin] = compteur
+                    compteur += 1
+                    prochain[voisin] = debut_voisins[voisin]
+                    pile.append(voisin)
+                elif decouverte[voisin] < bas[current]:
+                    bas[current] = decouverte[voisin]
+                continue
+
+            # sous-arbre de current terminé : remontée vers son parent
+            pile.pop()
+            index_parent = parent[current]
+            if index_parent == -1:
+                continue
+            if bas[current] < bas[index_parent]:
+                bas[index_parent] = bas[current]
+            if bas[current] > decouverte[index_parent]:
+                ponts.append((index_parent, current))
+            if index_parent == racine:
+                enfants_racine += 1
+            elif bas[current] >= decouverte[index_parent]:
+                articulations[index_parent] = 1
+        # la racine n'est un point d'articulation que si elle a plusieurs sous-arbres
+        if enfants_racine > 1:
+            articulations[racine] = 1
+
+    return [index for index in range(n) if articulations[index]], ponts
+
+
+# Centralités : une recherche par station source, réparties entre plusieurs processus. Le graphe (tableaux CSR)
+# est copié une fois dans une mémoire partagée que chaque processus projette en lecture seule au démarrage ;
+# une tâche n'envoie qu'un intervalle de sources et ne renvoie que ses résultats partiels.
+
+# tableaux CSR du processus de calcul, projetés par attacher()
+csr_partage: Optional[Tuple[int, memoryview, memoryview, memoryview]] = None
+memoire_partagee: Optional[shared_memory.SharedMemory] = None
+
+
+def partager(graphe: "Graphe") -> shared_memory.SharedMemory:
+    # en-tête puis debut_voisins (n + 1), voisins (m), poids (m) en entiers 32 bits natifs
+    n = graphe.nombre_stations()
+    m = graphe.nombre_aretes()
+    memoire = shared_memory.SharedMemory(create=True, size=EN_TETE_PARTAGE.size + 4 * (n + 1 + 2 * m))
+    EN_TETE_PARTAGE.pack_into(memoire.buf, 0, n, m)
+    position = EN_TETE_PARTAGE.size
+    for tableau in (graphe.debut_voisins, graphe.voisins, graphe.poids):
+        octets = array("i", tableau).tobytes()
+        memoire.buf[position:position + len(octets)] = octets
+        position += len(octets)
+    return memoire
+
+
+def projeter(buf: memoryview) -> Tuple[int, memoryview, memoryview, memoryview]:
+    n, m = EN_TETE_PARTAGE.unpack_from(buf, 0)
+    debut = EN_TETE_PARTAGE.size
+    debut_voisins = buf[debut:debut + 4 * (n + 1)].cast("i")
+    voisins = buf[debut + 4 * (n + 1):debut + 4 * (n + 1 + m)].cast("i")
+    poids = buf[debut + 4 * (n + 1 + m):debut + 4 * (n + 1 + 2 * m)].cast("i")
+    return n, debut_voisins, voisins, poids
+
+
+def attacher(nom: str) -> None:
+    # initialisation d'un processus de calcul
+    global csr_partage, memoire_partagee
+    # gardée ouverte jusqu'à l'arrêt du processus ; seul le processus principal la supprime (unlink)
+    memoire_partagee = shared_memory.SharedMemory(name=nom)
+    csr_partage = projeter(memoire_partagee.buf)
+
+
+def centralites_sources(premiere: int, derniere: int) -> Tuple[array, array]:
+    # Brandes (graphe pondéré) pour les sources premiere..derniere - 1 :
+    #   intermediarite partielle de chaque station (somme sur ces sources), proximité de chaque source
+    n, debut_voisins, voisins, poids = csr_partage
+    intermediarite = array("d", bytes(8 * n))
+    proximite = array("d")
+    for source in range(premiere, derniere):
+        temps = [INFINI] * n
+        # nombre de plus courts chemins depuis la source, prédécesseurs sur ces chemins
+        nb_chemins = [0] * n
+        predecesseurs: List[List[int]] = [[] for _ in range(n)]
+        # stations par temps croissant, pour la remontée
+        ordre: List[int] = []
+        temps[source] = 0
+        nb_chemins[source] = 1
+        tas = [(0, source)]
+        while tas:
+            temps_current, current = heapq.heappop(tas)
+            if temps_current > temps[current]:
+                continue
+            ordre.append(current)
+            for k in range(debut_voisins[current], debut_voisins[current + 1]):
+                voisin = voisins[k]
+                nouveau_temps = temps_current + poids[k]
+                if nouveau_temps < temps[voisin]:
+                    temps[voisin] = nouveau_temps
+                    nb_chemins[voisin] = nb_chemins[current]
+                    predecesseurs[voisin] = [current]
+                    heapq.heappush(tas, (nouveau_temps, voisin))
+                elif nouveau_temps == temps[voisin]:
+                    nb_chemins[voisin] += nb_chemins[current]
+                    predecesseurs[voisin].append(current)
+
+        dependance = [0.0] * n
+        for station in reversed(ordre):
+            for predecesseur in predecesseurs[station]:
+                dependance[predecesseur] += nb_chemins[predecesseur] / nb_chemins[station] * (1 + dependance[station])
+            if station != source:
+                intermediarite[station] += dependance[station]
+
+        # proximité de Wasserman et Faust : tient compte des stations inaccessibles
+        atteintes = len(ordre) - 1
+        total = sum(temps[station] for station in ordre)
+        proximite.append(atteintes / total * atteintes / (n - 1) if total > 0 and n > 1 else 0.0)
+    return intermediarite, proximite
+
+
+def liberer(memoire: shared_memory.SharedMemory) -> None:
+    memoire.close()
+    try:
+        memoire.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def centralites(graphe: "Graphe", nb_processus: int) -> Tuple[List[float], List[float]]:
+    # (intermédiarité, proximité) de chaque index de station, normalisées entre 0 et 1
+    n = graphe.nombre_stations()
+    memoire = partager(graphe)
+    # un arrêt du serveur pendant le calcul ne laisse pas le segment dans /dev/shm
+    atexit.register(liberer, memoire)
+    try:
+        intervalles = [(debut, min(debut + SOURCES_PAR_TACHE, n)) for debut in range(0, n, SOURCES_PAR_TACHE)]
+        intermediarite = [0.0] * n
+        proximite = [0.0] * n
+        # spawn et non fork : le pool est lancé depuis un thread d'un serveur multithread, un processus forké
+        # pourrait hériter d'un verrou tenu par un autre thread. Les processus n'ont besoin que de ce module
+        # (attacher, centralites_sources) ; le graphe passe par la mémoire partagée.
+        with ProcessPoolExecutor(max_workers=nb_processus, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=attacher, initargs=(memoire.name,)) as processus:
+            resultats = processus.map(centralites_sources, *zip(*intervalles))
+            for (debut, fin), (partielle, proximites) in zip(intervalles, resultats):
+                for index, valeur in enumerate(partielle):
+                    intermediarite[index] += valeur
+                proximite[debut:fin] = proximites
+    finally:
+        atexit.unregister(liberer)
+        liberer(memoire)
+
+    # graphe non orienté : chaque paire est comptée dans les deux sens ; normalisation par (n - 1)(n - 2) paires
+    echelle = 1 / ((n - 1) * (n - 2)) if n > 2 else 0.0
+    return [valeur * echelle for valeur in intermediarite], proximite
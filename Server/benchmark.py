@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import graphe
+from generateur import ecrire_reseau_synthetique
+
+# Mesure des moteurs de calcul sur Data/metro.txt et sur des réseaux synthétiques de taille croissante.
+#   python benchmark.py --sauver base.json            enregistre une référence
+#   python benchmark.py --comparer base.json --seuil 0.25
+#       code de sortie 1 si une médiane dépasse de plus de 25 % celle de la référence
+
+TAILLES_SYNTHETIQUES = ["16x24", "64x32", "256x40"]
+
+
+def percentile(valeurs: List[float], p: float) -> float:
+    # rang le plus proche, sur des valeurs triées
+    rang = max(0, min(len(valeurs) - 1, math.ceil(p * len(valeurs) / 100) - 1))
+    return valeurs[rang]
+
+
+def mesurer(operation: Callable[[], object], repetitions: int) -> Dict[str, float]:
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        operation()
+        durees.append((time.perf_counter() - debut) * 1000)
+
+    # mémoire mesurée à part : tracemalloc ralentit l'exécution
+    tracemalloc.start()
+    operation()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durees.sort()
+    return {
+        "n": repetitions,
+        "p50_ms": percentile(durees, 50),
+        "p90_ms": percentile(durees, 90),
+        "p99_ms": percentile(durees, 99),
+        "moyenne_ms": sum(durees) / len(durees),
+        "pic_memoire_ko": pic / 1024,
+    }
+
+
+def mesurer_lot(operation: Callable[[object], object], entrees: List, repetitions: int) -> Dict[str, float]:
+    # une mesure par entrée (une paire de stations par exemple), les entrées sont reprises en boucle
+    index = 0
+
+    def suivante():
+        nonlocal index
+        entree = entrees[index % len(entrees)]
+        index += 1
+        return operation(entree)
+
+    return mesurer(suivante, repetitions)
+
+
+def itineraire_complet(reseau: graphe.Graphe, paire: Tuple[graphe.Station, graphe.Station]) -> Optional[Tuple[Dict, List]]:
+    depart, arrivee = paire
+    resultat = graphe.dijkstra(reseau, depart, arrivee)
+    if resultat is None:
+        return None
+    choix_l = graphe.choix_lignes(reseau, resultat, arrivee.id)
+    graphe.get_full_itineraire(reseau, list(choix_l), resultat[arrivee.id][1])
+    return resultat, choix_l
+
+
+def mesurer_reseau(metro_path: str, positions_path: str, nb_paires: int, repetitions_arbres: int,
+                   graine: int) -> Dict[str, Dict[str, float]]:
+    resultats = {}
+    resultats["create_data"] = mesurer(lambda: graphe.create_data(metro_path), repetitions_arbres)
+
+    reseau = graphe.charger_depuis_texte(metro_path, positions_path)
+    stations = reseau.stations
+    rnd = random.Random(graine)
+    # seules les paires dont l'itinéraire complet aboutit sont gardées
+    paires = []
+    routes = []
+    essais = 0
+    while len(paires) < nb_paires and essais < nb_paires * 10:
+        essais += 1
+        paire = (rnd.choice(stations), rnd.choice(stations))
+        if paire[0].id == paire[1].id:
+            continue
+        try:
+            route = itineraire_complet(reseau, paire)
+        except (KeyError, IndexError):
+            continue
+        if route is not None:
+            paires.append(paire)
+            routes.append((paire[1], route[0], route[1]))
+    if not paires:
+        raise RuntimeError(f"aucun itinéraire calculable sur {metro_path}")
+
+    resultats["dijkstra"] = mesurer_lot(lambda paire: graphe.dijkstra(reseau, *paire), paires, len(paires))
+    resultats["choix_lignes"] = mesurer_lot(
+        lambda route: graphe.choix_lignes(reseau, route[1], route[0].id), routes, len(routes))
+    resultats["get_full_itineraire"] = mesurer_lot(
+        lambda route: graphe.get_full_itineraire(reseau, list(route[2]), route[1][route[0].id][1]), routes, len(routes))
+    departs = [rnd.choice(stations) for _ in range(repetitions_arbres)]
+    resultats["prim"] = mesurer_lot(lambda depart: graphe.prim(reseau, depart), departs, repetitions_arbres)
+    resultats["kruskal"] = mesurer(lambda: graphe.kruskal(reseau), repetitions_arbres)
+    resultats["taille"] = {"stations": reseau.nombre_stations(), "arcs": reseau.nombre_aretes()}
+    return resultats
+
+
+def comparer(resultats: Dict, reference: Dict, seuil: float) -> List[str]:
+    regressions = []
+    for nom_reseau, operations in reference["resultats"].items():
+        for nom_operation, mesure in operations.items():
+            if nom_operation == "taille":
+                continue
+            actuelle = resultats.get(nom_reseau, {}).get(nom_operation)
+            if actuelle is None:
+                continue
+            if actuelle["p50_ms"] > mesure["p50_ms"] * (1 + seuil):
+                regressions.append(
+                    f"{nom_reseau} / {nom_operation} : p50 {actuelle['p50_ms']:.3f} ms "
+                    f"contre {mesure['p50_ms']:.3f} ms (+{(actuelle['p50_ms'] / mesure['p50_ms'] - 1) * 100:.0f} %)"
+                )
+    return regressions
+
+
+def afficher(resultats: Dict) -> None:
+    for nom_reseau, operations in resultats.items():
+        taille = operations["taille"]
+        print(f"\n{nom_reseau} ({taille['stations']} stations, {taille['arcs']} arcs)")
+        print(f"  {'opération':<22}{'n':>6}{'p50 ms':>11}{'p90 ms':>11}{'p99 ms':>11}{'mémoire ko':>13}")
+        for nom_operation, mesure in operations.items():
+            if nom_operation == "taille":
+                continue
+            print(f"  {nom_operation:<22}{mesure['n']:>6}{mesure['p50_ms']:>11.3f}{mesure['p90_ms']:>11.3f}"
+                  f"{mesure['p99_ms']:>11.3f}{mesure['pic_memoire_ko']:>13.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark des calculs d'itinéraire et d'arbres couvrants")
+    parser.add_argument("--tailles", default=",".join(TAILLES_SYNTHETIQUES),
+                        help="réseaux synthétiques lignes x stations par ligne, séparés par des virgules ('' pour aucun)")
+    parser.add_argument("--paires", type=int, default=200, help="paires de stations mesurées par réseau")
+    parser.add_argument("--repetitions", type=int, default=5, help="répétitions de create_data, prim et kruskal")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--sauver", help="fichier JSON où enregistrer les résultats comme référence")
+    parser.add_argument("--comparer", help="fichier JSON de référence à comparer")
+    parser.add_argument("--seuil", type=float, default=0.25, help="hausse relative tolérée de la médiane")
+    args = parser.parse_args()
+
+    resultats = {"metro": mesurer_reseau(graphe.FICHIER_METRO, graphe.FICHIER_POSITIONS, args.paires,
+                                         args.repetitions, args.graine)}
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in filter(None, args.tailles.split(",")):
+            nb_lignes, stations_par_ligne = (int(valeur) for valeur in taille.split("x"))
+            metro_path = os.path.join(dossier, f"synthetique_{taille}.txt")
+            positions_path = os.path.join(dossier, f"synthetique_{taille}_pos.txt")
+            ecrire_reseau_synthetique(metro_path, positions_path, nb_lignes, stations_par_ligne, args.graine)
+            resultats[f"synthetique_{taille}"] = mesurer_reseau(metro_path, positions_path, args.paires,
+                                                                args.repetitions, args.graine)
+    afficher(resultats)
+
+    if args.sauver:
+        with open(args.sauver, "w", encoding="utf-8") as file:
+            json.dump({
+                "meta": {
+                    "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                },
+                "resultats": resultats,
+            }, file, ensure_ascii=False, indent=4)
+        print(f"\nRésultats sauvegardés sous {args.sauver}")
+
+    if args.comparer:
+        with open(args.comparer, "r", encoding="utf-8") as file:
+            reference = json.load(file)
+        regressions = comparer(resultats, reference, args.seuil)
+        if regressions:
+            print(f"\nRégressions (seuil {args.seuil * 100:.0f} %) :")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nAucune régression par rapport à {args.comparer} (seuil {args.seuil * 100:.0f} %)")
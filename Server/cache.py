@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class CacheLRU:
+    # Cache borné : l'entrée utilisée le moins récemment est évincée quand la capacité est atteinte
+    def __init__(self, capacite: int):
+        self.capacite = capacite
+        self.entrees: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # les requêtes Flask sont servies par plusieurs threads
+        self.verrou = threading.Lock()
+
+    def get(self, cle: Hashable) -> Optional[Any]:
+        with self.verrou:
+            valeur = self.entrees.get(cle)
+            if valeur is None:
+                self.misses += 1
+                return None
+            self.entrees.move_to_end(cle)
+            self.hits += 1
+            return valeur
+
+    def put(self, cle: Hashable, valeur: Any) -> None:
+        if self.capacite <= 0:
+            return
+        with self.verrou:
+            self.entrees[cle] = valeur
+            self.entrees.move_to_end(cle)
+            while len(self.entrees) > self.capacite:
+                self.entrees.popitem(last=False)
+                self.evictions += 1
+
+    def dupliquer(self, nouvelle_cle: Callable[[Hashable, Any], Optional[Hashable]]) -> int:
+        # recopie sous nouvelle_cle(cle, valeur) les entrées pour lesquelles elle ne renvoie pas None ;
+        # les entrées d'origine restent. Renvoie le nombre d'entrées recopiées
+        with self.verrou:
+            copies = [(nouvelle_cle(cle, valeur), valeur) for cle, valeur in list(self.entrees.items())]
+            copies = [(cle, valeur) for cle, valeur in copies if cle is not None]
+        for cle, valeur in copies:
+            self.put(cle, valeur)
+        return len(copies)
+
+    def vider(self) -> None:
+        # à appeler quand le graphe est rechargé : les compteurs sont conservés
+        with self.verrou:
+            self.entrees.clear()
+
+    def statistiques(self) -> Dict[str, int]:
+        with self.verrou:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "taille": len(self.entrees),
+                "capacite": self.capacite,
+            }
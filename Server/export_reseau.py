@@ -0,0 +1,103 @@
+import gzip
+import json
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graphe import Graphe
+
+# Réseau envoyé au client (/network) : même forme que Data/merged_data.json (data.py), en plus compact.
+# Construit, sérialisé et compressé une fois par instantané ; /network ne fait plus que renvoyer des octets.
+
+# ETag du corps gzip : version suivie de ce suffixe. Un validateur fort doit différer d'un codage à l'autre,
+# sinon un cache pourrait servir le corps gzip à un client qui ne l'a pas demandé.
+SUFFIXE_GZIP = "-gz"
+
+
+@dataclass(frozen=True)
+class ExportReseau:
+    # crc32 du corps non compressé, en hexadécimal : ETag de /network et version pour /network/delta
+    version: str
+    corps: bytes
+    corps_gzip: bytes
+    # id station -> entrée de "stations", (id, id voisin) -> temps, ligne -> ids des stations
+    stations: Mapping[int, Dict]
+    aretes: Mapping[Tuple[int, int], int]
+    lignes: Mapping[str, List[int]]
+
+
+def entree_station(graphe: "Graphe", index: int) -> Dict:
+    station = graphe.stations[index]
+    ligne, branchement = next(iter(station.lignes.items()), (None, None))
+    x, y = graphe.pos_x[index], graphe.pos_y[index]
+    # comme data.py : posX / posY à null pour une station absente de pospoints.txt (en (0, 0) dans le graphe)
+    sans_position = x == 0 and y == 0
+    return {
+        "id": station.id,
+        "name": station.name,
+        "ligne": ligne,
+        "terminus": str(station.terminus),
+        "branchement": branchement,
+        "posX": None if sans_position else x,
+        "posY": None if sans_position else y,
+    }
+
+
+def construire_export(graphe: "Graphe") -> ExportReseau:
+    stations = {station.id: entree_station(graphe, index) for index, station in enumerate(graphe.stations)}
+    # une arête par paire de stations voisines (la plus courte), dans le sens id croissant
+    aretes: Dict[Tuple[int, int], int] = {}
+    for index in range(graphe.nombre_stations()):
+        for index_voisin, temps in graphe.voisins_de(index):
+            cle = tuple(sorted((graphe.ids[index], graphe.ids[index_voisin])))
+            if temps < aretes.get(cle, temps + 1):
+                aretes[cle] = temps
+    lignes: Dict[str, List[int]] = {}
+    for station in graphe.stations:
+        for ligne in station.lignes:
+            lignes.setdefault(ligne, []).append(station.id)
+
+    data = {
+        "stations": list(stations.values()),
+        "edges": [{"start": debut, "end": fin, "time": temps} for (debut, fin), temps in sorted(aretes.items())],
+        "lines": [{"ligne": ligne, "stations": ids} for ligne, ids in sorted(lignes.items())],
+    }
+    version = format(zlib.crc32(serialiser(data)), "08x")
+    corps = serialiser({"status": 200, "data": {"version": version, **data}})
+    # mtime=0 : mêmes octets compressés pour le même réseau, d'un processus à l'autre
+    return ExportReseau(version, corps, gzip.compress(corps, compresslevel=9, mtime=0), stations, aretes, lignes)
+
+
+def serialiser(valeur) -> bytes:
+    return json.dumps(valeur, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def delta_export(ancien: ExportReseau, nouveau: ExportReseau) -> Dict:
+    # ce qui change de ancien à nouveau ; "lines" seulement si une ligne a changé
+    delta: Dict = {
+        "depuis": ancien.version,
+        "version": nouveau.version,
+        "stations": {
+            "modifiees": [entree for station_id, entree in nouveau.stations.items()
+                          if ancien.stations.get(station_id) != entree],
+            "supprimees": [station_id for station_id in ancien.stations if station_id not in nouveau.stations],
+        },
+        "edges": {
+            "modifiees": [{"start": debut, "end": fin, "time": temps} for (debut, fin), temps in nouveau.aretes.items()
+                          if ancien.aretes.get((debut, fin)) != temps],
+            "supprimees": [[debut, fin] for debut, fin in ancien.aretes if (debut, fin) not in nouveau.aretes],
+        },
+    }
+    if ancien.lignes != nouveau.lignes:
+        delta["lines"] = [{"ligne": ligne, "stations": ids} for ligne, ids in sorted(nouveau.lignes.items())]
+    return delta
+
+
+def lire_version(valeur: Optional[str]) -> str:
+    # accepte la version telle quelle ou l'ETag ("...", W/"...", celui du corps gzip compris)
+    valeur = (valeur or "").strip()
+    if valeur.startswith("W/"):
+        valeur = valeur[2:]
+    valeur = valeur.strip('"')
+    return valeur[:-len(SUFFIXE_GZIP)] if valeur.endswith(SUFFIXE_GZIP) else valeur
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Iterator, TextIO, Union
+
+# Format des fichiers réseau (voir l'en-tête de Data/metro.txt) :
+#   V num_sommet nom_sommet ;numéro_ligne ;si_terminus branchement
+#   E num_sommet1 num_sommet2 temps_en_secondes
+# Toutes les autres lignes sont des commentaires. Les lignes de description du format
+# ("V num_sommet nom_sommet ...") placées avant les données sont ignorées.
+
+EN_TETE = """-------------------  Projet graphe : {titre} --------------
+
+--------- 1) Description des données ------------
+
+# format pour les sommets :
+V num_sommet nom_sommet numéro_ligne si_terminus branchement (0 stations en commun, 1 pour la direction 1,  2 pour la direction 2, etc ...)
+
+# format pour les arrêtes :
+E num_sommet1 num_sommet2 temps_en_secondes
+
+PS : vous pouvez observez que les derniers arrêtes correspondent au temps de correspondance dans une même station.
+
+--------- 2) Les données ----------------------------------------
+"""
+
+
+class ErreurFormat(ValueError):
+    def __init__(self, file_path: str, numero_ligne: int, message: str):
+        super().__init__(f"{file_path}:{numero_ligne}: {message}")
+        self.file_path = file_path
+        self.numero_ligne = numero_ligne
+
+
+@dataclass
+class Sommet:
+    numero_ligne: int
+    id: int
+    name: str
+    ligne: str
+    terminus: bool
+    branchement: str
+
+
+@dataclass
+class Arete:
+    numero_ligne: int
+    id_1: int
+    id_2: int
+    temps: int
+
+
+def lire_sommet(file_path: str, numero_ligne: int, line: str) -> Sommet:
+    parts = line.split(" ;")
+    if len(parts) != 3:
+        raise ErreurFormat(file_path, numero_ligne, "sommet attendu : V num_sommet nom_sommet ;ligne ;terminus branchement")
+    sub_parts = parts[0].split(" ", 2)
+    sub_parts2 = parts[2].split()
+    if len(sub_parts) != 3 or not sub_parts[2].strip():
+        raise ErreurFormat(file_path, numero_ligne, "numéro ou nom de station manquant")
+    if len(sub_parts2) != 2 or sub_parts2[0].lower() not in ("true", "false"):
+        raise ErreurFormat(file_path, numero_ligne, "attendu : ;True|False branchement")
+    try:
+        id_station = int(sub_parts[1])
+    except ValueError:
+        raise ErreurFormat(file_path, numero_ligne, f"numéro de station invalide : {sub_parts[1]!r}") from None
+    return Sommet(numero_ligne, id_station, sub_parts[2], parts[1].strip(), sub_parts2[0].lower() == "true", sub_parts2[1])
+
+
+def lire_arete(file_path: str, numero_ligne: int, line: str) -> Arete:
+    parts = line.split()
+    if len(parts) != 4:
+        raise ErreurFormat(file_path, numero_ligne, "arête attendue : E num_sommet1 num_sommet2 temps_en_secondes")
+    try:
+        id_1, id_2, temps = int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        raise ErreurFormat(file_path, numero_ligne, "numéros de station et temps entiers attendus") from None
+    if temps < 0:
+        raise ErreurFormat(file_path, numero_ligne, f"temps négatif : {temps}")
+    return Arete(numero_ligne, id_1, id_2, temps)
+
+
+def lire_enregistrements(source: Union[str, TextIO]) -> Iterator[Union[Sommet, Arete]]:
+    # Générateur : un enregistrement à la fois, le fichier n'est jamais chargé en entier
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as file:
+            yield from lire_enregistrements_flux(file, source)
+    else:
+        yield from lire_enregistrements_flux(source, getattr(source, "name", "<flux>"))
+
+
+def lire_enregistrements_flux(file: TextIO, file_path: str) -> Iterator[Union[Sommet, Arete]]:
+    donnees_commencees = False
+    for numero_ligne, line in enumerate(file, start=1):
+        line = line.strip()
+        if not (line.startswith("V ") or line.startswith("E ")):
+            continue
+        # description du format avant les données : "V num_sommet ..." / "E num_sommet1 ..."
+        if not donnees_commencees and not line.split()[1].isdigit():
+            continue
+        donnees_commencees = True
+        if line.startswith("V "):
+            yield lire_sommet(file_path, numero_ligne, line)
+        else:
+            yield lire_arete(file_path, numero_ligne, line)
+
+
+def formater_sommet(sommet: Sommet) -> str:
+    return f"V {sommet.id:04d} {sommet.name} ;{sommet.ligne} ;{sommet.terminus} {sommet.branchement}"
+
+
+def formater_arete(arete: Arete) -> str:
+    return f"E {arete.id_1} {arete.id_2} {arete.temps}"
+
+
+def ecrire_enregistrements(file: TextIO, enregistrements: Iterator[Union[Sommet, Arete]], titre: str) -> None:
+    # Écrit en flux, avec le même en-tête que Data/metro.txt ; les sommets doivent précéder les arêtes
+    file.write(EN_TETE.format(titre=titre))
+    for enregistrement in enregistrements:
+        if isinstance(enregistrement, Sommet):
+            file.write(formater_sommet(enregistrement) + "\n")
+        else:
+            file.write(formater_arete(enregistrement) + "\n")
@@ -0,0 +1,168 @@
+import argparse
+import math
+import random
+from typing import Dict, Iterator, List, Tuple, Union
+
+from format_metro import Arete, Sommet, ecrire_enregistrements
+
+# Générateur déterministe de réseaux synthétiques ressemblant à un métro, au format de Data/metro.txt :
+# lignes tracées sur une carte, embranchements en fin de ligne, correspondances entre stations proches
+# (même nom, arêtes de correspondance en fin de fichier) et terminus en bout de chaque branche.
+
+ESPACEMENT = 30  # distance moyenne entre deux stations d'une ligne, en unités de carte
+SECONDES_PAR_UNITE = 1.5
+ARRET_EN_STATION = 20
+TEMPS_CORRESPONDANCE = (180, 240, 300)
+
+
+class ReseauSynthetique:
+    def __init__(self, nb_lignes: int, stations_par_ligne: int, graine: int = 0, proportion_branches: float = 0.25):
+        self.rnd = random.Random(graine)
+        self.nb_lignes = nb_lignes
+        self.stations_par_ligne = stations_par_ligne
+        self.proportion_branches = proportion_branches
+        self.sommets: List[Sommet] = []
+        self.positions: List[Tuple[int, int]] = []
+        self.aretes_ligne: List[Arete] = []
+        self.aretes_correspondance: List[Arete] = []
+        # nom de station -> ids des quais qui portent ce nom (une correspondance relie tous les quais)
+        self.quais: Dict[str, List[int]] = {}
+        # grille uniforme (cellule -> ids) pour trouver les stations proches sans tout parcourir
+        self.grille: Dict[Tuple[int, int], List[int]] = {}
+
+    def generer(self) -> "ReseauSynthetique":
+        for numero in range(1, self.nb_lignes + 1):
+            self.generer_ligne(str(numero))
+        return self
+
+    def generer_ligne(self, ligne: str) -> None:
+        n = self.stations_par_ligne
+        angle = self.rnd.uniform(0, 2 * math.pi)
+        avec_branches = n >= 6 and self.rnd.random() < self.proportion_branches
+        taille_tronc = self.rnd.randrange(n // 2, n - 2) if avec_branches else n
+
+        x, y = 0.0, 0.0
+        croisement = (-1, -1)
+        if self.sommets:
+            # chaque nouvelle ligne passe par une station existante : le réseau reste connexe
+            cible = self.rnd.randrange(len(self.sommets))
+            k = self.rnd.randrange(taille_tronc // 4, max(taille_tronc // 4 + 1, 3 * taille_tronc // 4))
+            croisement = (k, cible)
+            x, y = self.positions[cible]
+            x -= math.cos(angle) * ESPACEMENT * k
+            y -= math.sin(angle) * ESPACEMENT * k
+
+        tronc = self.tracer(ligne, x, y, angle, taille_tronc, "0", premier_terminus=True, dernier_terminus=not avec_branches,
+                            croisement=croisement)
+        if avec_branches:
+            x, y = self.positions[tronc[-1]]
+            for branchement, deviation in (("1", -0.5), ("2", 0.5)):
+                self.tracer(ligne, x, y, angle + deviation, n - taille_tronc, branchement,
+                            premier_terminus=False, dernier_terminus=True, depart=tronc[-1])
+
+    def tracer(self, ligne: str, x: float, y: float, angle: float, nb_stations: int, branchement: str,
+               premier_terminus: bool, dernier_terminus: bool, depart: int = -1,
+               croisement: Tuple[int, int] = (-1, -1)) -> List[int]:
+        ids: List[int] = []
+        precedent = depart
+        for k in range(nb_stations):
+            if precedent != -1:
+                angle += self.rnd.uniform(-0.3, 0.3)
+                pas = ESPACEMENT * self.rnd.uniform(0.7, 1.3)
+                x += math.cos(angle) * pas
+                y += math.sin(angle) * pas
+            if k == croisement[0]:
+                # (k, station) : la k-ième station est posée sur une station existante, qui devient une correspondance
+                x, y = self.positions[croisement[1]]
+            terminus = (premier_terminus and k == 0) or (dernier_terminus and k == nb_stations - 1)
+            station_id = self.ajouter_station(ligne, x, y, terminus, branchement, k == croisement[0])
+            if precedent != -1:
+                distance = math.dist(self.positions[precedent], self.positions[station_id])
+                temps = int(distance * SECONDES_PAR_UNITE) + ARRET_EN_STATION
+                self.aretes_ligne.append(Arete(0, precedent, station_id, temps))
+            ids.append(station_id)
+            precedent = station_id
+        return ids
+
+    def ajouter_station(self, ligne: str, x: float, y: float, terminus: bool, branchement: str,
+                        croisement: bool = False) -> int:
+        # croisement : station posée sur une station existante pour relier la ligne au réseau
+        station_id = len(self.sommets)
+        cellule = (int(x // ESPACEMENT), int(y // ESPACEMENT))
+        # une station d'une autre ligne à moins d'un tiers d'espacement devient une correspondance
+        proche = None
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for autre in self.grille.get((cellule[0] + dx, cellule[1] + dy), ()):
+                    if self.sommets[autre].ligne != ligne and math.dist(self.positions[autre], (x, y)) < ESPACEMENT / 3:
+                        proche = autre
+                        break
+                if proche is not None:
+                    break
+            if proche is not None:
+                break
+
+        if proche is None:
+            name = f"Station {ligne}-{station_id}"
+            self.quais[name] = []
+        else:
+            name = self.sommets[proche].name
+            if any(self.sommets[quai].ligne == ligne for quai in self.quais[name]):
+                # la ligne dessert déjà cette station : pas de second quai. Au croisement, le nouveau quai est
+                # quand même relié à la station croisée : la connexité ne dépend pas de l'autre quai de la ligne.
+                # Temps fixe : le tirage aléatoire, donc le reste du réseau d'une graine donnée, est inchangé.
+                if croisement:
+                    self.aretes_correspondance.append(Arete(0, proche, station_id, TEMPS_CORRESPONDANCE[0]))
+                name = f"Station {ligne}-{station_id}"
+                self.quais[name] = []
+            else:
+                x, y = self.positions[proche]
+                temps = self.rnd.choice(TEMPS_CORRESPONDANCE)
+                for quai in self.quais[name]:
+                    self.aretes_correspondance.append(Arete(0, quai, station_id, temps))
+
+        self.sommets.append(Sommet(0, station_id, name, ligne, terminus, branchement))
+        self.positions.append((int(round(x)), int(round(y))))
+        self.quais[name].append(station_id)
+        self.grille.setdefault(cellule, []).append(station_id)
+        return station_id
+
+    def enregistrements(self) -> Iterator[Union[Sommet, Arete]]:
+        yield from self.sommets
+        yield from self.aretes_ligne
+        # comme dans metro.txt, les correspondances sont listées en dernier
+        yield from self.aretes_correspondance
+
+
+def ecrire_reseau_synthetique(metro_path: str, positions_path: str, nb_lignes: int, stations_par_ligne: int,
+                              graine: int = 0, proportion_branches: float = 0.25) -> ReseauSynthetique:
+    reseau = ReseauSynthetique(nb_lignes, stations_par_ligne, graine, proportion_branches).generer()
+    with open(metro_path, "w", encoding="utf-8") as file:
+        titre = f"réseau synthétique, {nb_lignes} lignes de {stations_par_ligne} stations, graine {graine}"
+        ecrire_enregistrements(file, reseau.enregistrements(), titre)
+
+    # même format que Data/pospoints.txt : coordonnées positives, espaces du nom remplacés par @
+    min_x = min(x for x, _ in reseau.positions)
+    min_y = min(y for _, y in reseau.positions)
+    deja_ecrits = set()
+    with open(positions_path, "w", encoding="utf-8") as file:
+        for sommet, (x, y) in zip(reseau.sommets, reseau.positions):
+            if sommet.name not in deja_ecrits:
+                deja_ecrits.add(sommet.name)
+                file.write(f"{x - min_x};{y - min_y};{sommet.name.replace(' ', '@')}\n")
+    return reseau
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Génère un réseau de métro synthétique au format de Data/metro.txt")
+    parser.add_argument("metro", help="fichier réseau à écrire (format metro.txt)")
+    parser.add_argument("positions", help="fichier des positions à écrire (format pospoints.txt)")
+    parser.add_argument("--lignes", type=int, default=16)
+    parser.add_argument("--stations", type=int, default=24, help="stations par ligne")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--branches", type=float, default=0.25, help="proportion de lignes avec embranchement")
+    args = parser.parse_args()
+
+    reseau = ecrire_reseau_synthetique(args.metro, args.positions, args.lignes, args.stations, args.graine, args.branches)
+    print(f"Réseau synthétique sauvegardé sous {args.metro} ({len(reseau.sommets)} stations, "
+          f"{len(reseau.aretes_ligne) + len(reseau.aretes_correspondance)} arêtes)")
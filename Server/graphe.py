@@ -1,10 +1,55 @@
-from dataclasses import dataclass
-from typing import List, Dict, Tuple
+import bisect
+import gc
+import heapq
+import json
+import math
+import os
+import threading
+import time
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import List, Dict, Tuple, Iterator, Mapping, Optional, Callable
 
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
+from alternatives import chaine_depuis_chemin, k_plus_courts_chemins, poids_arc
+from analyse import centralites, elements_critiques
+from cache import CacheLRU
+from export_reseau import SUFFIXE_GZIP, ExportReseau, construire_export, delta_export, lire_version
+from metriques import Registre
+from format_metro import ErreurFormat, Sommet, lire_enregistrements
+from hierarchie import Hierarchie, charger_hierarchie
+from index_noms import IndexNoms
+from perturbations import (Perturbations, TableReparee, aretes_du_graphe, appliquer_perturbations, arcs_modifies,
+                           cle_arete, ecrire_perturbations, lire_perturbations, perturbations_valides,
+                           verrou_fichier)
+from precalcul import TableRoutes, charger_table_routes
+from profilage import Profileur, lire_taux
+from snapshot import ecrire_snapshot, empreinte_sources, lire_snapshot
+from spatial import GrilleSpatiale
+
+INFINI = float("inf")
+
+# chemins relatifs au dossier du projet, indépendants du dossier courant
+DOSSIER_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Data")
+# METRO_FICHIER / METRO_POSITIONS permettent de servir un autre réseau (par exemple généré par generateur.py)
+FICHIER_METRO = os.environ.get("METRO_FICHIER", os.path.join(DOSSIER_DATA, "metro.txt"))
+FICHIER_POSITIONS = os.environ.get("METRO_POSITIONS", os.path.join(DOSSIER_DATA, "pospoints.txt"))
+FICHIER_SNAPSHOT = os.path.join(DOSSIER_DATA, "graphe.bin")
+FICHIER_ROUTES = os.path.join(DOSSIER_DATA, "routes.bin")
+FICHIER_HIERARCHIE = os.path.join(DOSSIER_DATA, "hierarchie.bin")
+FICHIER_PERTURBATIONS = os.path.join(DOSSIER_DATA, "perturbations.json")
+# anneau des profils de requêtes (METRO_PROFIL_TAUX entre 0 et 1 pour un échantillon, et en-tête X-Profil: 1
+# si METRO_PROFIL_ENTETE=1)
+DOSSIER_PROFILS = os.path.join(DOSSIER_DATA, "profils")
+MAX_PROFILS = 50
+# temps de l'arête ajoutée par creer_connexite entre deux composantes connexes de metro.txt
+POIDS_LIAISON = 1000
+
 @dataclass
 class Station:
     id: int
@@ -39,105 +84,364 @@ class Station:
     def get_essential_info(self):
         return f"{self.name} ({self.id})"
 
-def get_connexe(test_stations, missing_stations, station: Station):
-    for voisin in station.voisins:
-        if voisin[0] not in test_stations:
-            test_stations.append(voisin[0])
-            missing_stations.remove(voisin[0])
-            get_connexe(test_stations, missing_stations, voisin[0])
-
-def creer_connexite():
-    init = all_stations[0]
-    test_stations = [init]
-    missing_stations = all_stations.copy()
-    missing_stations.remove(init)
-    get_connexe(test_stations, missing_stations, init)
-
-    station_test = next((station for station in all_stations if station not in missing_stations), None)
-    for station in missing_stations:
-        station.voisins.append((station_test, 1000))
-        station_test.voisins.append((station, 1000))
-
-def dijkstra(depart: Station, arrivee: Station):
+@dataclass(frozen=True)
+class Graphe:
+    # Figé une fois construit : lu par tous les threads sans verrou, remplacé en bloc au rechargement
+    # (seul le mémo directions se remplit, un calcul fait deux fois en parallèle donne la même table)
+    # index -> station
+    stations: Tuple[Station, ...]
+    # id station -> index
+    index_par_id: Mapping[int, int]
+    # tableaux en lecture seule : memoryview sur un array, ou sur le fichier quand le graphe vient du snapshot binaire
+    # index -> id station
+    ids: array
+    # voisins de l'index i : voisins[debut_voisins[i]:debut_voisins[i + 1]] (format CSR)
+    debut_voisins: array
+    voisins: array
+    poids: array
+    # positions sur la carte (pospoints.txt), par index
+    pos_x: array
+    pos_y: array
+    # plus petit temps par unité de distance sur une arête : rend l'heuristique A* admissible
+    # 0 si des positions manquent (A* se ramène alors à Dijkstra)
+    facteur_heuristique: float
+    # (id station, ligne) -> {id station visée : terminus à annoncer}, rempli au premier besoin par directions_depuis
+    directions: Dict[Tuple[int, str], Dict[int, Tuple[str, ...]]] = field(default_factory=dict)
+    # graphe de metro.txt dont celui-ci est une version perturbée (perturbations.py), None pour le graphe d'origine
+    reference: Optional["Graphe"] = None
+
+    def get_station(self, station_id: int) -> Optional[Station]:
+        index = self.index_par_id.get(station_id)
+        if index is None:
+            return None
+        return self.stations[index]
+
+    def voisins_de(self, index: int) -> Iterator[Tuple[int, int]]:
+        # (index voisin, temps) pour chaque arête sortante
+        for k in range(self.debut_voisins[index], self.debut_voisins[index + 1]):
+            yield self.voisins[k], self.poids[k]
+
+    def directions_depuis(self, station_id: int, ligne: str) -> Dict[int, Tuple[str, ...]]:
+        # un parcours de la ligne par (station, ligne), puis un simple accès au dictionnaire
+        # les terminus annoncés restent ceux du plan d'origine, même si une fermeture coupe la ligne
+        if self.reference is not None:
+            return self.reference.directions_depuis(station_id, ligne)
+        cle = (station_id, ligne)
+        table = self.directions.get(cle)
+        if table is None:
+            table = calcul_direction(self, self.index_par_id[station_id], ligne)
+            self.directions[cle] = table
+        return table
+
+    def nombre_stations(self) -> int:
+        return len(self.stations)
+
+    def nombre_aretes(self) -> int:
+        return len(self.voisins)
+
+    def empreinte(self) -> int:
+        # somme de contrôle de la topologie et des temps : identifie une version du graphe
+        empreinte = 0
+        for tableau in (self.ids, self.debut_voisins, self.voisins, self.poids):
+            empreinte = zlib.crc32(tableau.tobytes(), empreinte)
+        return empreinte
+
+    def empreinte_complete(self) -> int:
+        # empreinte() plus les noms, lignes et terminus, qui apparaissent dans le texte des itinéraires
+        meta = json.dumps([[station.id, station.name, station.lignes, station.terminus] for station in self.stations],
+                          ensure_ascii=False)
+        return zlib.crc32(meta.encode("utf-8"), self.empreinte())
+
+    def plus_courts_chemins(self, index_depart: int, temps_max: float = INFINI) -> Tuple[List[float], List[int]]:
+        # Dijkstra complet depuis un index : (temps, index provenance) pour chaque index, -1 sans provenance
+        # temps_max : arrêt dès que le temps traité le dépasse ; seuls les temps <= temps_max sont alors définitifs
+        n = self.nombre_stations()
+        temps = [INFINI] * n
+        precedent = [-1] * n
+        # ordre de première découverte, pour départager les égalités comme dijkstra()
+        ordre = [0] * n
+        traitees = bytearray(n)
+        temps[index_depart] = 0
+        tas: List[Tuple[float, int, int]] = [(0, 0, index_depart)]
+        nb_decouvertes = 0
+        while tas:
+            temps_current, _, current = heapq.heappop(tas)
+            if temps_current > temps_max:
+                break
+            if traitees[current]:
+                continue
+            traitees[current] = 1
+            for k in range(self.debut_voisins[current], self.debut_voisins[current + 1]):
+                voisin = self.voisins[k]
+                nouveau_temps = temps_current + self.poids[k]
+                if nouveau_temps < temps[voisin]:
+                    if temps[voisin] == INFINI:
+                        nb_decouvertes += 1
+                        ordre[voisin] = nb_decouvertes
+                    temps[voisin] = nouveau_temps
+                    precedent[voisin] = current
+                    heapq.heappush(tas, (nouveau_temps, ordre[voisin], voisin))
+        return temps, precedent
+
+def construire_graphe(stations: List[Station], positions: Optional[Dict[str, Tuple[int, int]]] = None) -> Graphe:
+    # Construit une seule fois au chargement : l'ordre des voisins est conservé
+    index_par_id = {station.id: index for index, station in enumerate(stations)}
+    ids = array("i", (station.id for station in stations))
+    debut_voisins = array("i", [0])
+    voisins = array("i")
+    poids = array("i")
+    for station in stations:
+        for voisin, temps in station.voisins:
+            voisins.append(index_par_id[voisin.id])
+            poids.append(temps)
+        debut_voisins.append(len(voisins))
+
+    positions = positions or {}
+    pos_x = array("d", (positions.get(station.name, (0, 0))[0] for station in stations))
+    pos_y = array("d", (positions.get(station.name, (0, 0))[1] for station in stations))
+    facteur_heuristique = 0.0
+    if stations and all(station.name in positions for station in stations):
+        facteur_heuristique = INFINI
+        for index in range(len(stations)):
+            for k in range(debut_voisins[index], debut_voisins[index + 1]):
+                distance = math.hypot(pos_x[index] - pos_x[voisins[k]], pos_y[index] - pos_y[voisins[k]])
+                if distance > 0:
+                    facteur_heuristique = min(facteur_heuristique, poids[k] / distance)
+        if facteur_heuristique == INFINI:
+            facteur_heuristique = 0.0
+
+    return Graphe(
+        tuple(stations), MappingProxyType(index_par_id),
+        *(memoryview(tableau).toreadonly() for tableau in (ids, debut_voisins, voisins, poids, pos_x, pos_y)),
+        facteur_heuristique
+    )
+
+def charger_positions(file_path: str) -> Dict[str, Tuple[int, int]]:
+    # Format : posX;posY;nom@de@la@station
+    positions: Dict[str, Tuple[int, int]] = {}
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                pos_x, pos_y, nom = line.split(";", 2)
+                # même règle que data.py : la dernière position lue pour un nom l'emporte
+                positions[nom.replace("@", " ").strip()] = (int(pos_x), int(pos_y))
+    except FileNotFoundError:
+        print(f"Fichier non trouvé : {file_path}")
+    return positions
+
+def creer_connexite(stations: List[Station]):
+    # Une passe union-find sur les arêtes, puis une seule arête de POIDS_LIAISON entre la première station
+    # et le représentant (première station rencontrée) de chaque autre composante
+    index_par_id = {station.id: index for index, station in enumerate(stations)}
+    composantes = EnsemblesDisjoints(len(stations))
+    for index, station in enumerate(stations):
+        for voisin, _ in station.voisins:
+            composantes.unir(index, index_par_id[voisin.id])
+
+    init = stations[0]
+    reliees = {composantes.trouver(0)}
+    for index, station in enumerate(stations):
+        racine = composantes.trouver(index)
+        if racine not in reliees:
+            reliees.add(racine)
+            station.voisins.append((init, POIDS_LIAISON))
+            init.voisins.append((station, POIDS_LIAISON))
+
+def parcours_tas(reseau: Graphe, depart: Station, arrivee: Station, heuristique: Optional[Callable[[int], float]] = None):
     # Pour chaque id station : id station provenance + le temps pour arriver à la station en question depuis le debut
-    stations: {int: Tuple[int, int]} = {}
-    # Liste des id stations déjà traitées
-    stations_traitees: List[int] = []
-    # id station : le temps pour arriver à cette station
-    current_station: Tuple[int, int] = (depart.id, 0)
+    stations: Dict[int, Tuple[int, int]] = {}
+    if depart.id == arrivee.id:
+        return stations
 
-    no_station_available: bool = False
+    index_depart = reseau.index_par_id[depart.id]
+    index_arrivee = reseau.index_par_id[arrivee.id]
+    debut_voisins, voisins, poids, ids = reseau.debut_voisins, reseau.voisins, reseau.poids, reseau.ids
+
+    temps = [INFINI] * reseau.nombre_stations()
+    # ordre de première découverte : départage les égalités comme le parcours des stations dans l'ordre d'ajout
+    ordre = [0] * reseau.nombre_stations()
+    traitees = bytearray(reseau.nombre_stations())
+    temps[index_depart] = 0
+    # (priorité, ordre de découverte, index station)
+    tas: List[Tuple[float, int, int]] = [(0, 0, index_depart)]
+    nb_decouvertes = 0
+
+    while tas:
+        _, _, current = heapq.heappop(tas)
+        if traitees[current]:
+            continue
+        # arrêt anticipé : le temps de l'arrivée est définitif
+        if current == index_arrivee:
+            return stations
+        traitees[current] = 1
+        temps_current = temps[current]
+        for k in range(debut_voisins[current], debut_voisins[current + 1]):
+            voisin = voisins[k]
+            # ne traite pas le sommet de depart
+            if voisin == index_depart:
+                continue
+            nouveau_temps = temps_current + poids[k]
+            if nouveau_temps < temps[voisin]:
+                if temps[voisin] == INFINI:
+                    nb_decouvertes += 1
+                    ordre[voisin] = nb_decouvertes
+                temps[voisin] = nouveau_temps
+                stations[ids[voisin]] = (ids[current], nouveau_temps)
+                priorite = nouveau_temps if heuristique is None else nouveau_temps + heuristique(voisin)
+                heapq.heappush(tas, (priorite, ordre[voisin], voisin))
+
+    # arrivée inaccessible
+    return None
 
-    while current_station[0] != arrivee.id and not no_station_available:
-        stations_traitees.append(current_station[0])
+def dijkstra(reseau: Graphe, depart: Station, arrivee: Station):
+    return parcours_tas(reseau, depart, arrivee)
 
-        real_station = get_station_by_id(current_station[0], all_stations)
-        # parcours les stations voisines pour modifier leur parcours
-        for neighbor_station in real_station.voisins:
-            neighbor_id = neighbor_station[0].id
-            neighbor_time_travel = neighbor_station[1]
+def a_etoile(reseau: Graphe, depart: Station, arrivee: Station):
+    index_arrivee = reseau.index_par_id[arrivee.id]
+    facteur = reseau.facteur_heuristique
+    x_arrivee = reseau.pos_x[index_arrivee]
+    y_arrivee = reseau.pos_y[index_arrivee]
 
-            # ne traite pas le sommet de depart
-            if neighbor_id != depart.id:
-                # pas encore ajouté
-                if stations.get(neighbor_id) is None:
-                    stations[neighbor_id] = (current_station[0], current_station[1] + neighbor_time_travel)
-                else:
-                    # modifie la station précédente si c'est plus rapide avec ce chemin qu'avec l'ancien
-                    potential_new_time: int = current_station[1] + neighbor_time_travel
-                    if potential_new_time < stations[neighbor_id][1]:
-                        stations[neighbor_id] = [current_station[0], potential_new_time]
-        # choisi la nouvelle station à traiter
-        selected_station: (int, int) = None
-        for station in stations.keys():
-            if station not in stations_traitees:
-                if selected_station is None:
-                    selected_station = (station, stations[station][1])
-                else:
-                    if stations[station][1] < selected_station[1]:
-                        selected_station = (station, stations[station][1])
-        if selected_station is None:
-            no_station_available = True
-        else:
-            current_station = selected_station
+    # borne inférieure du temps restant : distance à vol d'oiseau * plus petit temps par unité de distance
+    def heuristique(index: int) -> float:
+        return facteur * math.hypot(reseau.pos_x[index] - x_arrivee, reseau.pos_y[index] - y_arrivee)
 
-    # gerer le cas où dijkstra plante :
-    if no_station_available:
+    if facteur == 0:
+        return parcours_tas(reseau, depart, arrivee)
+    return parcours_tas(reseau, depart, arrivee, heuristique)
+
+def dijkstra_bidirectionnel(reseau: Graphe, depart: Station, arrivee: Station):
+    stations: Dict[int, Tuple[int, int]] = {}
+    if depart.id == arrivee.id:
+        return stations
+
+    index_depart = reseau.index_par_id[depart.id]
+    index_arrivee = reseau.index_par_id[arrivee.id]
+    debut_voisins, voisins, poids, ids = reseau.debut_voisins, reseau.voisins, reseau.poids, reseau.ids
+    n = reseau.nombre_stations()
+
+    # sens 0 : depuis le départ, sens 1 : depuis l'arrivée (le graphe est non orienté)
+    temps = ([INFINI] * n, [INFINI] * n)
+    precedent = ([-1] * n, [-1] * n)
+    traitees = (bytearray(n), bytearray(n))
+    temps[0][index_depart] = 0
+    temps[1][index_arrivee] = 0
+    tas = ([(0, index_depart)], [(0, index_arrivee)])
+    meilleur_temps = INFINI
+    rencontre = -1
+
+    while tas[0] and tas[1]:
+        # plus aucun chemin ne peut améliorer le meilleur trouvé
+        if tas[0][0][0] + tas[1][0][0] >= meilleur_temps:
+            break
+        sens = 0 if tas[0][0][0] <= tas[1][0][0] else 1
+        temps_current, current = heapq.heappop(tas[sens])
+        if traitees[sens][current]:
+            continue
+        traitees[sens][current] = 1
+        for k in range(debut_voisins[current], debut_voisins[current + 1]):
+            voisin = voisins[k]
+            nouveau_temps = temps_current + poids[k]
+            if nouveau_temps < temps[sens][voisin]:
+                temps[sens][voisin] = nouveau_temps
+                precedent[sens][voisin] = current
+                heapq.heappush(tas[sens], (nouveau_temps, voisin))
+            if temps[sens][voisin] + temps[1 - sens][voisin] < meilleur_temps:
+                meilleur_temps = temps[sens][voisin] + temps[1 - sens][voisin]
+                rencontre = voisin
+
+    if rencontre == -1:
         return None
+
+    # moitié avant : provenance déjà dans le bon sens
+    current = rencontre
+    while current != index_depart:
+        stations[ids[current]] = (ids[precedent[0][current]], temps[0][current])
+        current = precedent[0][current]
+    # moitié arrière : on retourne les arcs jusqu'à l'arrivée
+    current = rencontre
+    while current != index_arrivee:
+        suivant = precedent[1][current]
+        stations[ids[suivant]] = (ids[current], meilleur_temps - temps[1][suivant])
+        current = suivant
     return stations
 
-def get_station_by_id(station_id: int, stations_to_search_in: List[Station]):
-    for station in stations_to_search_in:
-        if station.id == station_id:
-            return station
-    return None
+def chaine_depuis_arbre(reseau: Graphe, temps: List[float], precedent: List[int], index_depart: int, index_arrivee: int):
+    # Même format que dijkstra(), limité au trajet, à partir d'un arbre de Graphe.plus_courts_chemins
+    stations: Dict[int, Tuple[int, int]] = {}
+    if temps[index_arrivee] == INFINI:
+        return None
+    current = index_arrivee
+    while current != index_depart:
+        stations[reseau.ids[current]] = (reseau.ids[precedent[current]], temps[current])
+        current = precedent[current]
+    return stations
 
-def calcul_direction(deja_vu: List, lst_terminus: set, current: Station, final_dest: Station, ligne: str, trouve: bool, branchement_initial: str):
-    new_trouve = trouve or current.id == final_dest.id
-    
-    deja_vu.append(current.id)
-    for voisin in current.voisins:
-        if (voisin[0].id not in deja_vu) and (ligne in voisin[0].lignes.keys()):
+# valeurs acceptées pour /dijkstra?algo=
+# "table" relit la table précalculée (precalcul.py) quand l'instantané en a une, voir recherche_chemin
+ALGORITHMES_CHEMIN: Dict[str, Callable[[Graphe, Station, Station], Optional[Dict[int, Tuple[int, int]]]]] = {
+    "table": dijkstra,
+    "ch": dijkstra,
+    "dijkstra": dijkstra,
+    "astar": a_etoile,
+    "bidirectionnel": dijkstra_bidirectionnel,
+}
+
+def calcul_direction(graphe: Graphe, index_depart: int, ligne: str) -> Dict[int, Tuple[str, ...]]:
+    # Parcours en profondeur le long de la ligne depuis index_depart (même ordre de visite que l'ancien parcours récursif).
+    # Un terminus est annoncé pour une station visée s'il est atteint après elle dans l'arbre de parcours.
+    stations = graphe.stations
+    branchement_initial = stations[index_depart].lignes[ligne]
+    parent: Dict[int, int] = {index_depart: -1}
+    ordre: List[int] = [index_depart]
+    # index station -> terminus atteints directement depuis elle
+    terminus_voisins: Dict[int, List[int]] = {index_depart: []}
+    pile = [(index_depart, graphe.voisins_de(index_depart))]
+    while pile:
+        current, voisins_restants = pile[-1]
+        for voisin, _ in voisins_restants:
+            station_voisin = stations[voisin]
+            if voisin in parent or ligne not in station_voisin.lignes:
+                continue
             # si on est initialement sur le branchement 0
             # OU on arrive sur le branchement 0
             # OU on est sur le meme branchement
-            if branchement_initial == "0" or voisin[0].lignes[ligne] == "0" or branchement_initial == voisin[0].lignes[ligne]:
-                if voisin[0].terminus:
-                    if new_trouve or voisin[0].id == final_dest.id:
-                        lst_terminus.add(voisin[0].name)
+            branchement = station_voisin.lignes[ligne]
+            if branchement_initial == "0" or branchement == "0" or branchement_initial == branchement:
+                if station_voisin.terminus:
+                    terminus_voisins[current].append(voisin)
                 else:
-                    calcul_direction(deja_vu, lst_terminus, voisin[0], final_dest, ligne, new_trouve, branchement_initial)
-
-def get_all_possible_destinations(first_station: Station, last_station: Station, ligne: str):
-    terminus = set()
-    calcul_direction([], terminus, first_station, last_station, ligne, False, first_station.lignes[ligne])
-    return terminus
-
-def get_ligne_optimale(dijkstra: {int: Tuple[int, int]}, initial: Station):
+                    parent[voisin] = current
+                    ordre.append(voisin)
+                    terminus_voisins[voisin] = []
+                    pile.append((voisin, graphe.voisins_de(voisin)))
+                    break
+        else:
+            pile.pop()
+
+    # terminus du sous-arbre de chaque station, des feuilles vers la racine
+    sous_arbre = {index: {stations[t].name for t in terminus_voisins[index]} for index in ordre}
+    for index in reversed(ordre[1:]):
+        sous_arbre[parent[index]] |= sous_arbre[index]
+    # noms triés : le texte de l'itinéraire ne dépend pas de l'ordre d'un set
+    resultat = {graphe.ids[index]: tuple(sorted(sous_arbre[index])) for index in ordre}
+    # un terminus visé s'annonce lui-même
+    for index in ordre:
+        for t in terminus_voisins[index]:
+            resultat.setdefault(graphe.ids[t], (stations[t].name,))
+    return resultat
+
+def get_all_possible_destinations(reseau: Graphe, first_station: Station, last_station: Station, ligne: str):
+    return reseau.directions_depuis(first_station.id, ligne).get(last_station.id, ())
+
+def get_ligne_optimale(reseau: Graphe, dijkstra: {int: Tuple[int, int]}, initial: Station):
     current = initial
     lst_lignes = set(current.lignes.keys())
     while len(lst_lignes) != 0 or len(lst_lignes) != 1:
-        current = get_station_by_id(dijkstra[current.id][0], all_stations)
+        current = reseau.get_station(dijkstra[current.id][0])
         lst_lignes_suivantes = lst_lignes & current.lignes.keys()
         if len(lst_lignes_suivantes) == 1:
             return next(iter(lst_lignes_suivantes)) # taille 1, donc le seul élément
@@ -150,29 +454,29 @@ def get_ligne_optimale(dijkstra: {int: Tuple[int, int]}, initial: Station):
         return None
 
 
-def choix_lignes(dijkstra: {int: Tuple[int, int]}, arrivee: int):
+def choix_lignes(reseau: Graphe, dijkstra: {int: Tuple[int, int]}, arrivee: int):
     ligne_choisie: str = ""
     ligne_par_arret: [(int, str)] = []
-    current = get_station_by_id(arrivee, all_stations)
-    ligne_par_arret.append((current.id, get_ligne_optimale(dijkstra, current)))
+    current = reseau.get_station(arrivee)
+    ligne_par_arret.append((current.id, get_ligne_optimale(reseau, dijkstra, current)))
     while current.id in dijkstra:
-        x = get_station_by_id(dijkstra[current.id][0], all_stations)
+        x = reseau.get_station(dijkstra[current.id][0])
         lignes_possible = current.lignes.keys() & x.lignes.keys()
         if len(lignes_possible) == 0: # pas de ligne commune -> besoin de marcher
-            ligne_choisie = get_ligne_optimale(dijkstra, x)
+            ligne_choisie = get_ligne_optimale(reseau, dijkstra, x)
             ligne_par_arret.append((x.id, ligne_choisie + "-marche"))
         else:
             if ligne_choisie not in lignes_possible: # la ligne courante n'est plus sur le trajet -> besoin de changer de metro
-                ligne_choisie = get_ligne_optimale(dijkstra, current)
+                ligne_choisie = get_ligne_optimale(reseau, dijkstra, current)
             ligne_par_arret.append((x.id, ligne_choisie))
         current = x
     return ligne_par_arret
 
 
-def doit_changer_direction(init: int, next: int, ligne: str):
+def doit_changer_direction(reseau: Graphe, init: int, next: int, ligne: str):
     # si init et next sont sur le meme branchement
-    init_station = get_station_by_id(init, all_stations)
-    next_station = get_station_by_id(next, all_stations)
+    init_station = reseau.get_station(init)
+    next_station = reseau.get_station(next)
     if init_station.lignes[ligne] == next_station.lignes[ligne]:
         return False
 
@@ -190,7 +494,7 @@ def doit_changer_direction(init: int, next: int, ligne: str):
 
 
 
-def get_full_itineraire(choix_l: [(int, str)], temps: int):
+def get_full_itineraire(reseau: Graphe, choix_l: [(int, str)], temps: int):
     itineraire: List[str] = []
     choix_lignes = choix_l
     choix_lignes.reverse()
@@ -203,14 +507,14 @@ def get_full_itineraire(choix_l: [(int, str)], temps: int):
     est_fini = False
     next = choix_lignes[index_parcours]
     affiche_indication = False
-    itineraire.append(f"Débutez à la station {get_station_by_id(init[0], all_stations).name}")
+    itineraire.append(f"Débutez à la station {reseau.get_station(init[0]).name}")
     while not est_fini:
-        init_station = get_station_by_id(init[0], all_stations)
-        fin_station = get_station_by_id(fin[0], all_stations)
+        init_station = reseau.get_station(init[0])
+        fin_station = reseau.get_station(fin[0])
         if next[1] == init[1] or next[1].startswith(init[1] + "-"): # on peut rester sur la meme ligne
-            if doit_changer_direction(init[0], next[0], ligne):
+            if doit_changer_direction(reseau, init[0], next[0], ligne):
                 itineraire.append(
-                    f"Prenez la ligne {ligne} direction {' ou '.join(get_all_possible_destinations(init_station, fin_station, ligne))} jusqu'à {fin_station.name}"
+                    f"Prenez la ligne {ligne} direction {' ou '.join(get_all_possible_destinations(reseau, init_station, fin_station, ligne))} jusqu'à {fin_station.name}"
                 )
 
                 init = fin
@@ -218,22 +522,22 @@ def get_full_itineraire(choix_l: [(int, str)], temps: int):
             if next[1].startswith(init[1] + "-"):
                 doit_marcher = True
         else: # changement de ligne
-            next_station = get_station_by_id(next[0], all_stations)
+            next_station = reseau.get_station(next[0])
             if doit_marcher:
-                directions = " ou ".join(get_all_possible_destinations(init_station, fin_station, ligne))
+                directions = " ou ".join(get_all_possible_destinations(reseau, init_station, fin_station, ligne))
                 itineraire.append(f"Prenez la ligne {ligne} direction {directions} jusqu'à {fin_station.name}")
                 itineraire.append(f"Marchez jusqu'à la station {next_station.name}")
             else:
-                directions = " ou ".join(get_all_possible_destinations(init_station, fin_station, ligne))
+                directions = " ou ".join(get_all_possible_destinations(reseau, init_station, fin_station, ligne))
                 itineraire.append(f"Prenez la ligne {ligne} direction {directions} jusqu'à {next_station.name}")
             affiche_indication = True
             init = next
             ligne = init[1].split("-", 1)[0]
             doit_marcher = False
         if index_parcours == (len(choix_lignes) - 1): # si on est sur le dernier sommet
-            next_station = get_station_by_id(next[0], all_stations)
+            next_station = reseau.get_station(next[0])
             if not affiche_indication:
-                directions = " ou ".join(get_all_possible_destinations(init_station, fin_station, ligne))
+                directions = " ou ".join(get_all_possible_destinations(reseau, init_station, fin_station, ligne))
                 itineraire.append(f"Prenez la ligne {ligne} direction {directions} jusqu'à {fin_station.name}")
             itineraire.append(f"Vous devriez arriver à {next_station.name} en {temps} secondes")
             est_fini = True
@@ -243,204 +547,1211 @@ def get_full_itineraire(choix_l: [(int, str)], temps: int):
             next = choix_lignes[index_parcours]
     return itineraire
 
-def prim(depart: Station):
-    non_vu = []
-    deja_vu: List[Station] = []
-    aretes: [[int, int]] = []
-
-    for station in all_stations:
-        non_vu.append(station.id)
-
-    current = depart
-    deja_vu.append(current)
-    non_vu.remove(current.id)
-    while len(non_vu) > 0:
-        # liste de Tuple(station1, station2, cout)
-        arretes_eligibles: List[Tuple[Station, Station, int]] = []
-        # toutes les stations deja_vu
-        for station in deja_vu:
-            # tous les voisins de ces stations
-            for voisin in station.voisins:
-                # voisin non_vu = ne fait pas de boucle
-                if voisin[0].id in non_vu:
-                    # arrete entre la station et son voisin est éligible
-                    arretes_eligibles.append((station, voisin[0], voisin[1]))
-        if len(arretes_eligibles) > 0:
-            # tri les aretes par cout croissant
-            arretes_eligibles.sort(key=lambda x: x[2])
-            aretes.append([arretes_eligibles[0][0].id, arretes_eligibles[0][1].id])
-            deja_vu.append(arretes_eligibles[0][1])
-            non_vu.remove(arretes_eligibles[0][1].id)
+@dataclass
+class Etiquette:
+    # état de parcours_correspondances : arrivée à une station, sur une ligne, après un nombre de correspondances
+    index: int
+    # ligne de la rame où l'on se trouve, None à pied (au départ ou dans un couloir de correspondance)
+    ligne: Optional[str]
+    # branchement suivi sur cette ligne, "0" tant que la course reste sur le tronc commun
+    branchement: str
+    correspondances: int
+    temps: int
+    precedente: Optional["Etiquette"]
+
+def branchement_suivi(branchement: str, branchement_voisin: str) -> Optional[str]:
+    # branchement après un arc de la ligne, None s'il faut changer de rame (même règle que doit_changer_direction)
+    if branchement == "0" or branchement_voisin == "0" or branchement == branchement_voisin:
+        return branchement if branchement_voisin == "0" else branchement_voisin
+    return None
+
+def parcours_correspondances(reseau: Graphe, depart: Station, arrivee: Station, max_correspondances: int) -> List[Etiquette]:
+    # Dijkstra multicritère (temps, correspondances) sur les états (station, ligne, branchement) : un arc entre deux
+    # stations sans ligne commune est une correspondance à pied, un changement de branchement sur une même ligne
+    # oblige à changer de rame. Renvoie le front de Pareto à l'arrivée, du plus rapide au moins de correspondances
+    # (chaque étiquette a strictement moins de correspondances que la précédente), [] si l'arrivée est inaccessible
+    stations = reseau.stations
+    index_arrivee = reseau.index_par_id[arrivee.id]
+    # (index, ligne, branchement) -> plus petit nombre de correspondances déjà fixé pour cet état
+    fixees: Dict[Tuple[int, Optional[str], str], int] = {}
+    front: List[Etiquette] = []
+    # une étiquette avec autant de correspondances que la meilleure arrivée trouvée ne peut plus être sur le front
+    limite = max_correspondances + 1
+    tas: List[Tuple[int, int, int, Etiquette]] = [(0, 0, 0, Etiquette(reseau.index_par_id[depart.id], None, "0", 0, 0, None))]
+    nb_ajouts = 0
+
+    while tas:
+        temps, correspondances, _, etiquette = heapq.heappop(tas)
+        if correspondances >= limite:
+            continue
+        cle = (etiquette.index, etiquette.ligne, etiquette.branchement)
+        if fixees.get(cle, limite) <= correspondances:
+            continue
+        fixees[cle] = correspondances
+        if etiquette.index == index_arrivee:
+            # sorties par temps croissant : ne reste sur le front que ce qui a moins de correspondances
+            front.append(etiquette)
+            limite = correspondances
+            if limite == 0:
+                break
+            continue
+
+        station = stations[etiquette.index]
+        for index_voisin, poids in reseau.voisins_de(etiquette.index):
+            voisin = stations[index_voisin]
+            communes = station.lignes.keys() & voisin.lignes.keys()
+            suivants: List[Tuple[Optional[str], str, int]] = []
+            if not communes:
+                # correspondance à pied : compte quand on descend d'une rame
+                suivants.append((None, "0", correspondances + (etiquette.ligne is not None)))
+            for ligne in communes:
+                if etiquette.ligne == ligne:
+                    branchement = branchement_suivi(etiquette.branchement, voisin.lignes[ligne])
+                    if branchement is None:
+                        # changement de direction à l'embranchement
+                        suivants.append((ligne, voisin.lignes[ligne], correspondances + 1))
+                    else:
+                        suivants.append((ligne, branchement, correspondances))
+                else:
+                    # montée dans une rame : correspondance si on était déjà dans une autre
+                    branchement = branchement_suivi(station.lignes[ligne], voisin.lignes[ligne]) or voisin.lignes[ligne]
+                    suivants.append((ligne, branchement, correspondances + (etiquette.ligne is not None)))
+            for ligne, branchement, nouvelles_correspondances in suivants:
+                if nouvelles_correspondances < limite and fixees.get((index_voisin, ligne, branchement), limite) > nouvelles_correspondances:
+                    nb_ajouts += 1
+                    heapq.heappush(tas, (temps + poids, nouvelles_correspondances, nb_ajouts, Etiquette(
+                        index_voisin, ligne, branchement, nouvelles_correspondances, temps + poids, etiquette
+                    )))
+    return front
+
+def trajets_depuis_etiquette(reseau: Graphe, etiquette: Etiquette) -> List[Dict]:
+    # découpe le chemin d'une étiquette en trajets : une rame (ligne, direction) ou un passage à pied (ligne None)
+    chaine: List[Etiquette] = []
+    while etiquette is not None:
+        chaine.append(etiquette)
+        etiquette = etiquette.precedente
+    chaine.reverse()
+
+    trajets: List[Dict] = []
+    for avant, apres in zip(chaine, chaine[1:]):
+        id_avant = reseau.ids[avant.index]
+        id_apres = reseau.ids[apres.index]
+        trajet = trajets[-1] if trajets else None
+        if trajet is None or trajet["ligne"] != apres.ligne or apres.correspondances != avant.correspondances:
+            trajet = {"ligne": apres.ligne, "stations": [id_avant], "temps": 0}
+            trajets.append(trajet)
+        trajet["stations"].append(id_apres)
+        trajet["temps"] += apres.temps - avant.temps
+    for trajet in trajets:
+        if trajet["ligne"] is not None:
+            trajet["direction"] = list(
+                reseau.directions_depuis(trajet["stations"][0], trajet["ligne"]).get(trajet["stations"][-1], ())
+            )
+    return trajets
+
+def itineraire_depuis_trajets(reseau: Graphe, trajets: List[Dict], temps: int) -> List[str]:
+    # mêmes phrases que get_full_itineraire
+    depart = reseau.get_station(trajets[0]["stations"][0]) if trajets else None
+    itineraire: List[str] = [f"Débutez à la station {depart.name}"] if depart else []
+    for trajet in trajets:
+        fin_station = reseau.get_station(trajet["stations"][-1])
+        if trajet["ligne"] is None:
+            itineraire.append(f"Marchez jusqu'à la station {fin_station.name}")
         else:
-            return aretes
-    return aretes
-
-def mettre_a_jour_deja_vu(deja_vu: List[List[Station]], current: [Station, Station], aretes: [[int, int]]) -> None:
-    station_a = current[0]
-    station_b = current[1]
-    index_a = None
-    index_b = None
-
-    # Trouver les sous-listes contenant les stations
-    for idx, sous_liste in enumerate(deja_vu):
-        if station_a in sous_liste:
-            index_a = idx
-        if station_b in sous_liste:
-            index_b = idx
-
-    # Cas 1 : Aucune station n'est dans deja_vu
-    if index_a is None and index_b is None:
-        deja_vu.append([station_a, station_b])
-        aretes.append([current[0].id, current[1].id])
-
-    # Cas 2 : Une seule station est dans deja_vu
-    elif index_a is not None and index_b is None:
-        deja_vu[index_a].append(station_b)
-        aretes.append([current[0].id, current[1].id])
-    elif index_a is None and index_b is not None:
-        deja_vu[index_b].append(station_a)
-        aretes.append([current[0].id, current[1].id])
-
-    # Cas 3 : Les deux stations sont dans des sous-listes différentes
-    elif index_a is not None and index_b is not None and index_a != index_b:
-        # Fusionner les deux sous-listes
-        deja_vu[index_a].extend(deja_vu[index_b])
-        del deja_vu[index_b]
-        aretes.append([current[0].id, current[1].id])
-
-    # Cas 4 : Les deux stations sont déjà dans la même sous-liste
-    # Rien à faire dans ce cas
-
-def kruskal():
-    deja_vu: List[List[Station]] = []
-    aretes: [[int, int]] = []
-
-    aretes_eligibles: List[Tuple[Station, Station, int]] = []
-
-    for station in all_stations:
-        for voisin in station.voisins:
-            aretes_eligibles.append((station, voisin[0], voisin[1]))
+            itineraire.append(
+                f"Prenez la ligne {trajet['ligne']} direction {' ou '.join(trajet['direction'])} jusqu'à {fin_station.name}"
+            )
+    if depart:
+        itineraire.append(f"Vous devriez arriver à {reseau.get_station(trajets[-1]['stations'][-1]).name} en {temps} secondes")
+    return itineraire
+
+def prim(reseau: Graphe, depart: Station) -> Tuple[List[List[int]], int]:
+    aretes: List[List[int]] = []
+    poids_total = 0
+
+    deja_vu = bytearray(reseau.nombre_stations())
+    # tas de (cout, ordre d'ajout, index station, index voisin) : à coût égal, la première arête ajoutée l'emporte
+    # les arêtes devenues inutiles (voisin déjà vu) restent dans le tas et sont ignorées à la sortie
+    tas: List[Tuple[int, int, int, int]] = []
+    nb_ajouts = 0
+
+    def ajouter_aretes(index: int) -> None:
+        nonlocal nb_ajouts
+        deja_vu[index] = 1
+        for index_voisin, temps in reseau.voisins_de(index):
+            if not deja_vu[index_voisin]:
+                heapq.heappush(tas, (temps, nb_ajouts, index, index_voisin))
+                nb_ajouts += 1
+
+    ajouter_aretes(reseau.index_par_id[depart.id])
+    while tas:
+        temps, _, index, index_voisin = heapq.heappop(tas)
+        if deja_vu[index_voisin]:
+            continue
+        aretes.append([reseau.ids[index], reseau.ids[index_voisin]])
+        poids_total += temps
+        ajouter_aretes(index_voisin)
+    return aretes, poids_total
+
+class EnsemblesDisjoints:
+    # Union-find avec compression de chemin et union par rang
+    def __init__(self, taille: int):
+        self.parent = list(range(taille))
+        self.rang = [0] * taille
+
+    def trouver(self, element: int) -> int:
+        racine = element
+        while self.parent[racine] != racine:
+            racine = self.parent[racine]
+        # compression : tous les éléments parcourus pointent directement sur la racine
+        while self.parent[element] != racine:
+            self.parent[element], element = racine, self.parent[element]
+        return racine
+
+    def unir(self, a: int, b: int) -> bool:
+        # False si a et b sont déjà dans le même ensemble
+        racine_a = self.trouver(a)
+        racine_b = self.trouver(b)
+        if racine_a == racine_b:
+            return False
+        if self.rang[racine_a] < self.rang[racine_b]:
+            racine_a, racine_b = racine_b, racine_a
+        self.parent[racine_b] = racine_a
+        if self.rang[racine_a] == self.rang[racine_b]:
+            self.rang[racine_a] += 1
+        return True
+
+def kruskal(reseau: Graphe) -> Tuple[List[List[int]], int]:
+    aretes: List[List[int]] = []
+    poids_total = 0
+    n = reseau.nombre_stations()
+
+    # chaque arête non orientée n'est gardée qu'une fois, dans le sens où on la rencontre en premier
+    aretes_eligibles: List[Tuple[int, int, int]] = []
+    for index in range(n):
+        for index_voisin, temps in reseau.voisins_de(index):
+            if index < index_voisin:
+                aretes_eligibles.append((index, index_voisin, temps))
 
     # Trier les arêtes par poids (le dernier élément du tuple)
     aretes_eligibles.sort(key=lambda x: x[2])
 
-    while len(aretes_eligibles) > 0:
-        current_arete = [aretes_eligibles[0][0], aretes_eligibles[0][1]]
-        mettre_a_jour_deja_vu(deja_vu, current_arete, aretes)
-        del aretes_eligibles[0]
+    composantes = EnsemblesDisjoints(n)
+    for index, index_voisin, temps in aretes_eligibles:
+        if composantes.unir(index, index_voisin):
+            aretes.append([reseau.ids[index], reseau.ids[index_voisin]])
+            poids_total += temps
+            # arbre couvrant complet
+            if len(aretes) == n - 1:
+                break
+
+    return aretes, poids_total
+
+def create_data(file_path: str = FICHIER_METRO) -> List[Station]:
+    # Lecture en flux des enregistrements V / E ; ErreurFormat indique le fichier et le numéro de ligne fautifs
+    stations: List[Station] = []
+    # id station -> station, pour relier les arêtes sans parcourir la liste
+    stations_par_id: Dict[int, Station] = {}
+    for enregistrement in lire_enregistrements(file_path):
+        if isinstance(enregistrement, Sommet):
+            if enregistrement.id in stations_par_id:
+                raise ErreurFormat(file_path, enregistrement.numero_ligne, f"station {enregistrement.id} déjà définie")
+            station = Station(enregistrement.id, enregistrement.name, {enregistrement.ligne: enregistrement.branchement},
+                              enregistrement.terminus, [])
+            stations.append(station)
+            stations_par_id[station.id] = station
+        else:
+            station_1 = stations_par_id.get(enregistrement.id_1)
+            station_2 = stations_par_id.get(enregistrement.id_2)
+            if station_1 is None or station_2 is None:
+                inconnue = enregistrement.id_1 if station_1 is None else enregistrement.id_2
+                raise ErreurFormat(file_path, enregistrement.numero_ligne, f"station {inconnue} inconnue")
+            station_1.voisins.append((station_2, enregistrement.temps))
+            station_2.voisins.append((station_1, enregistrement.temps))
+    if len(stations) == 0:
+        raise ErreurFormat(file_path, 0, "aucune station")
+    return stations
 
-    return aretes
+@dataclass(frozen=True)
+class Lieu:
+    # une station sur la carte : les stations de même nom (une par ligne) partagent la position
+    nom: str
+    x: float
+    y: float
+    ids: Tuple[int, ...]
+
+@dataclass(frozen=True)
+class Carte:
+    # lieux du réseau et grille de leurs positions, pour /nearest
+    lieux: Tuple[Lieu, ...]
+    grille: GrilleSpatiale
+
+    def plus_proches(self, x: float, y: float, k: int) -> List[Tuple[float, Lieu]]:
+        return [(distance, self.lieux[point]) for distance, point in self.grille.plus_proches(x, y, k)]
+
+def construire_carte(reseau: Graphe) -> Carte:
+    # une station sans position dans pospoints.txt est en (0, 0) (construire_graphe) : elle n'est pas indexée
+    ids_par_lieu: Dict[Tuple[str, float, float], List[int]] = {}
+    for index, station in enumerate(reseau.stations):
+        x, y = reseau.pos_x[index], reseau.pos_y[index]
+        if x != 0 or y != 0:
+            ids_par_lieu.setdefault((station.name, x, y), []).append(station.id)
+    lieux = tuple(Lieu(nom, x, y, tuple(ids)) for (nom, x, y), ids in ids_par_lieu.items())
+    return Carte(lieux, GrilleSpatiale([lieu.x for lieu in lieux], [lieu.y for lieu in lieux]))
+
+@dataclass(frozen=True)
+class Instantane:
+    # Tout ce qu'une requête lit du réseau. Une requête prend l'instantané courant une fois au début
+    # et s'y tient : un rechargement en parallèle ne lui mélange jamais deux versions du graphe
+    reseau: Graphe
+    # table de tous les plus courts chemins (python precalcul.py), None si absente ou périmée
+    table_routes: Optional[TableRoutes]
+    # change dès que la topologie, les temps ou les noms changent : les réponses en cache d'une autre version ne servent plus
+    version: int
+    # date de modification (ns) du snapshot binaire au moment du chargement, 0 s'il n'existe pas
+    date_snapshot: int
+    # fermetures et temps modifiés appliqués à reseau (reseau.reference est alors le graphe de metro.txt)
+    perturbations: Perturbations
+    # date de modification (ns) de Data/perturbations.json à sa lecture, 0 s'il n'existe pas
+    date_perturbations: int
+    # positions des stations (celles de metro.txt, les perturbations n'y changent rien)
+    carte: Carte
+    # hiérarchie de contraction (python hierarchie.py), None si absente, périmée ou si des perturbations sont en cours
+    hierarchie: Optional[Hierarchie]
+    # réseau servi par /network, déjà sérialisé et compressé
+    export: ExportReseau
+    # noms des stations pour /search (ceux de metro.txt, les perturbations n'y changent rien)
+    index_noms: IndexNoms
 
-def create_data():
-    # Chemin du fichier
-    file_path = "../Data/metro.txt"
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
 
-    stations = []
-    can_add_station = False
-    can_add_edge = False
-    # Lecture et traitement des lignes
-    try:
-        with open(file_path, "r") as file:
-            for line in file:
-                line = line.strip()  # Supprimer les espaces inutiles au début/fin
-                if line.startswith("V"):
-                    if can_add_station:
-                        # Action à effectuer si la ligne commence par "V"
-                        parts = line.split(" ;")
-                        sub_parts = parts[0].split(" ", 2)
-                        sub_parts2 = parts[2].split(" ")
-
-                        id_station = sub_parts[1]
-                        name_station = sub_parts[2]
-                        lignes_station = {parts[1]: sub_parts2[1]}
-                        is_terminus_station = sub_parts2[0].lower() == "true"
-
-                        stations.append(Station(int(id_station), name_station, lignes_station, is_terminus_station, []))
-                    can_add_station = True
-                if line.startswith("E"):
-                    if can_add_edge:
-                        parts = line.split(" ")
-                        station_1 = get_station_by_id(int(parts[1]), stations)
-                        station_2 = get_station_by_id(int(parts[2]), stations)
-                        station_1.voisins.append((station_2, int(parts[3])))
-                        station_2.voisins.append((station_1, int(parts[3])))
-                    can_add_edge = True
-        return stations
+# réponses /dijkstra sérialisées, clé (s1, s2, algo, version du graphe)
+TAILLE_CACHE_DIJKSTRA = 1024
+cache_dijkstra = CacheLRU(TAILLE_CACHE_DIJKSTRA)
+# stations atteintes depuis une station, clé (station, tranche de PAS_ISOCHRONE secondes, version du graphe)
+PAS_ISOCHRONE = 300
+TAILLE_CACHE_ISOCHRONES = 256
+cache_isochrones = CacheLRU(TAILLE_CACHE_ISOCHRONES)
+# réponses /analysis/*, clé (analyse, version du graphe) : calculées une fois par version
+TAILLE_CACHE_ANALYSES = 16
+cache_analyses = CacheLRU(TAILLE_CACHE_ANALYSES)
+# /search : nombre de résultats par défaut et maximal
+RESULTATS_RECHERCHE = 10
+MAX_RESULTATS_RECHERCHE = 50
+# processus du calcul des centralités (/analysis/centrality)
+NB_PROCESSUS_CENTRALITE = os.cpu_count() or 1
+# nombre maximal de paires par appel à /dijkstra/batch
+MAX_PAIRES_BATCH = 10000
+# /matrix : nombre maximal d'origines (un Dijkstra complet chacune) et de destinations par appel
+MAX_ORIGINES_MATRICE = 100
+MAX_DESTINATIONS_MATRICE = 1000
+# /nearest : k maximal ; nombre maximal de points par appel à /nearest/batch
+MAX_PLUS_PROCHES = 50
+MAX_POINTS_BATCH = 10000
+# réseaux /network des instantanés précédents (version -> ExportReseau), base des réponses /network/delta
+HISTORIQUE_EXPORTS = 16
+exports_precedents = CacheLRU(HISTORIQUE_EXPORTS)
+# borne (et valeur par défaut) de /itineraire?max_correspondances=
+MAX_CORRESPONDANCES = 8
+# /dijkstra/alternatives : k maximal, stations traitées au plus par requête (toutes recherches comprises),
+# part maximale du temps d'une alternative passée sur les arêtes d'une autre déjà retenue
+MAX_ALTERNATIVES = 10
+TRAVAIL_MAX_ALTERNATIVES = 200000
+RECOUVREMENT_MAX_ALTERNATIVES = 0.8
+# intervalle minimal entre deux vérifications du snapshot binaire par un processus
+SECONDES_ENTRE_VERIFICATIONS = 2.0
+
+# compteurs et histogrammes de durée exposés sur /metrics
+metriques = Registre()
+metriques.decrire("metro_requetes_total", "counter", "Requêtes reçues par route")
+metriques.decrire("metro_erreurs_total", "counter", "Réponses en erreur par route (type 400 ou exception)")
+metriques.decrire("metro_requete_duree_secondes", "histogram", "Durée totale des requêtes par route")
+metriques.decrire("metro_etape_duree_secondes", "histogram", "Durée de chaque étape du calcul")
+metriques.decrire("metro_rechargements_total", "counter", "Rechargements du réseau par résultat")
+metriques.decrire("metro_graphe_stations", "gauge", "Nombre de stations du graphe servi")
+metriques.decrire("metro_graphe_arcs", "gauge", "Nombre d'arcs (arêtes dans les deux sens) du graphe servi")
+metriques.decrire("metro_cache_dijkstra", "gauge", "Compteurs et taille du cache des réponses /dijkstra")
+metriques.decrire("metro_cache_isochrones", "gauge", "Compteurs et taille du cache des recherches /isochrone")
+metriques.decrire("metro_perturbations", "gauge", "Stations fermées, arêtes fermées et temps modifiés en cours")
+metriques.jauge("metro_graphe_stations", lambda: {(): instantane.reseau.nombre_stations()})
+metriques.jauge("metro_graphe_arcs", lambda: {(): instantane.reseau.nombre_aretes()})
+metriques.jauge("metro_cache_dijkstra", lambda: {
+    (("valeur", nom),): valeur for nom, valeur in cache_dijkstra.statistiques().items()
+})
+metriques.jauge("metro_cache_isochrones", lambda: {
+    (("valeur", nom),): valeur for nom, valeur in cache_isochrones.statistiques().items()
+})
+metriques.jauge("metro_perturbations", lambda: {
+    (("type", "stations_fermees"),): len(instantane.perturbations.stations_fermees),
+    (("type", "aretes_fermees"),): len(instantane.perturbations.aretes_fermees),
+    (("type", "temps"),): len(instantane.perturbations.temps),
+})
+
+# profilage à la demande de /dijkstra, /prim et /kruskal ; METRO_PROFIL_FORMAT : "collapsed" ou "pstats"
+profileur = Profileur(DOSSIER_PROFILS, taux=lire_taux(os.environ.get("METRO_PROFIL_TAUX")),
+                      entete=os.environ.get("METRO_PROFIL_ENTETE") == "1", max_fichiers=MAX_PROFILS,
+                      format_sortie=os.environ.get("METRO_PROFIL_FORMAT", "collapsed"))
+
+def compter_erreur(route: str) -> None:
+    # réponse {"status": "400"}
+    metriques.incrementer("metro_erreurs_total", route=route, type="400")
+
+def recherche_chemin(courant: Instantane, algo: str):
+    # "table" : lecture de la table précalculée de cet instantané si elle existe, sinon hiérarchie de contraction,
+    # sinon dijkstra ; "ch" : hiérarchie de contraction si elle existe, sinon dijkstra
+    if algo == "table" and courant.table_routes is not None:
+        return courant.table_routes.chemin
+    if algo in ("table", "ch") and courant.hierarchie is not None:
+        return courant.hierarchie.chemin
+    return ALGORITHMES_CHEMIN.get(algo)
+
+def calculer_itineraire(reseau: Graphe, recherche, depart: int, arrivee: int):
+    # recherche : fonction de recherche_chemin, None pour un algorithme inconnu
+    premiere_station = reseau.get_station(depart)
+    derniere_station = reseau.get_station(arrivee)
+    dijkstra_test = None
+    if recherche is not None:
+        with metriques.mesurer("metro_etape_duree_secondes", etape="recherche"):
+            dijkstra_test = recherche(reseau, premiere_station, derniere_station)
+
+    return rendre_itineraire(reseau, dijkstra_test, derniere_station)
+
+def rendre_itineraire(reseau: Graphe, dijkstra_test: Optional[Dict[int, Tuple[int, int]]], derniere_station: Station):
+    if dijkstra_test is None:
+        print("Error")
+        return {
+            "status": "400"
+        }
 
-    except FileNotFoundError:
-        print(f"Fichier non trouvé : {file_path}")
-    except Exception as e:
-        print(f"Erreur : {e}")
+    with metriques.mesurer("metro_etape_duree_secondes", etape="choix_lignes"):
+        choix_l = choix_lignes(reseau, dijkstra_test, derniere_station.id)
+    sommets = [(choix_l[i][0], int(choix_l[i+1][0])) for i in range(len(choix_l)-1)]
+    sommets_ordonne = sommets
+    sommets_ordonne.reverse()
+    with metriques.mesurer("metro_etape_duree_secondes", etape="get_full_itineraire"):
+        itineraire = get_full_itineraire(reseau, choix_l, dijkstra_test[derniere_station.id][1])
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+    return {
+        "status": 200,
+        "data": {
+            "stations": sommets_ordonne,
+            "itineraire": itineraire,
+            "temps": dijkstra_test[derniere_station.id][1]
+        }
+    }
+
+def lire_ids(reseau: Graphe, valeur: Optional[str]) -> Optional[List[int]]:
+    # "1,2,3" -> [1, 2, 3] ; None si la liste est vide ou contient une station inconnue
+    try:
+        ids = [int(morceau) for morceau in (valeur or "").split(",") if morceau.strip()]
+    except ValueError:
+        return None
+    if len(ids) == 0 or any(station_id not in reseau.index_par_id for station_id in ids):
+        return None
+    return ids
 
 @app.route('/dijkstra', methods=['GET'])
+@metriques.instrumenter("dijkstra")
+@profileur.profiler("dijkstra")
 def execute_dijkstra():
+    courant = instantane
     # Récupérer les paramètres 's1' et 's2' depuis l'URL
     depart = int(request.args.get('s1'))
     arrivee = int(request.args.get('s2'))
+    algo = request.args.get('algo', 'table')
+    if algo not in ALGORITHMES_CHEMIN:
+        # refusé avant le cache : des valeurs d'algo quelconques n'en chassent pas les vrais trajets
+        compter_erreur("dijkstra")
+        return jsonify({"status": "400"})
+
+    # réponse déjà sérialisée si la même demande a été faite sur la même version du graphe ;
+    # une requête profilée refait le calcul
+    cle = (depart, arrivee, algo, courant.version)
+    en_cache = None if profileur.en_cours() else cache_dijkstra.get(cle)
+    if en_cache is None:
+        response = calculer_itineraire(courant.reseau, recherche_chemin(courant, algo), depart, arrivee)
+        with metriques.mesurer("metro_etape_duree_secondes", etape="jsonify"):
+            corps = jsonify(response).get_data()
+        # arêtes du trajet : permettent de garder la réponse après une fermeture ailleurs (reporter_cache)
+        aretes = tuple(response["data"]["stations"]) if response["status"] == 200 else ()
+        en_cache = (corps, response["status"], aretes)
+        cache_dijkstra.put(cle, en_cache)
+    corps, status, _ = en_cache
+    if status == "400":
+        compter_erreur("dijkstra")
 
-    premiere_station = get_station_by_id(depart, all_stations)
-    derniere_station = get_station_by_id(arrivee, all_stations)
-    dijkstra_test = dijkstra(premiere_station, derniere_station)
+    # Retourner une réponse JSON
+    return app.response_class(corps, mimetype="application/json")
 
-    if dijkstra_test is None:
-        print("Error")
-        response = {
-            "status": "400"
+@app.route('/itineraire', methods=['GET'])
+@metriques.instrumenter("itineraire")
+def execute_itineraire():
+    reseau = instantane.reseau
+    # s1, s2 : stations ; max_correspondances : 0 à MAX_CORRESPONDANCES ; pareto=1 : toutes les options du front
+    try:
+        depart = reseau.get_station(int(request.args.get('s1')))
+        arrivee = reseau.get_station(int(request.args.get('s2')))
+        max_correspondances = int(request.args.get('max_correspondances', MAX_CORRESPONDANCES))
+    except (TypeError, ValueError):
+        depart = arrivee = None
+    if depart is None or arrivee is None or not 0 <= max_correspondances <= MAX_CORRESPONDANCES:
+        compter_erreur("itineraire")
+        return jsonify({"status": "400"})
+
+    with metriques.mesurer("metro_etape_duree_secondes", etape="correspondances"):
+        front = parcours_correspondances(reseau, depart, arrivee, max_correspondances)
+    if not front:
+        compter_erreur("itineraire")
+        return jsonify({"status": "400"})
+    if request.args.get('pareto') != '1':
+        front = front[:1]
+
+    options = []
+    for etiquette in front:
+        trajets = trajets_depuis_etiquette(reseau, etiquette)
+        options.append({
+            "temps": etiquette.temps,
+            "correspondances": etiquette.correspondances,
+            "trajets": trajets,
+            "itineraire": itineraire_depuis_trajets(reseau, trajets, etiquette.temps)
+        })
+
+    response = {
+        "status": 200,
+        "data": {
+            "options": options
         }
-    else:
-        choix_l = choix_lignes(dijkstra_test, derniere_station.id)
-        sommets = [(choix_l[i][0], int(choix_l[i+1][0])) for i in range(len(choix_l)-1)]
-        sommets_ordonne = sommets
-        sommets_ordonne.reverse()
-        itineraire = get_full_itineraire(choix_l, dijkstra_test[derniere_station.id][1])
-
-        response = {
-            "status": 200,
-            "data": {
-                "stations": sommets_ordonne,
-                "itineraire": itineraire,
-                "temps": dijkstra_test[derniere_station.id][1]
-            }
+    }
+
+    return jsonify(response)
+
+@app.route('/dijkstra/alternatives', methods=['GET'])
+@metriques.instrumenter("alternatives")
+def execute_dijkstra_alternatives():
+    reseau = instantane.reseau
+    # s1, s2 : stations ; k : nombre d'itinéraires voulus, 1 à MAX_ALTERNATIVES
+    try:
+        depart = reseau.get_station(int(request.args.get('s1')))
+        arrivee = reseau.get_station(int(request.args.get('s2')))
+        k = int(request.args.get('k', 3))
+    except (TypeError, ValueError):
+        depart = arrivee = None
+    if depart is None or arrivee is None or depart.id == arrivee.id or not 1 <= k <= MAX_ALTERNATIVES:
+        compter_erreur("alternatives")
+        return jsonify({"status": "400"})
+
+    with metriques.mesurer("metro_etape_duree_secondes", etape="alternatives"):
+        chemins, complet = k_plus_courts_chemins(
+            reseau, reseau.index_par_id[depart.id], reseau.index_par_id[arrivee.id], k,
+            TRAVAIL_MAX_ALTERNATIVES, RECOUVREMENT_MAX_ALTERNATIVES
+        )
+    if not chemins:
+        compter_erreur("alternatives")
+        return jsonify({"status": "400"})
+
+    alternatives = []
+    for _, chemin in chemins:
+        try:
+            resultat = rendre_itineraire(reseau, chaine_depuis_chemin(reseau, chemin), arrivee)
+        except Exception:
+            # même traitement que /dijkstra/batch : un itinéraire en échec n'empêche pas les autres
+            app.logger.exception(f"Alternative {depart.id} -> {arrivee.id} en échec")
+            continue
+        alternatives.append(resultat["data"])
+
+    response = {
+        "status": 200,
+        "data": {
+            "alternatives": alternatives,
+            # vrai si le budget de calcul a arrêté la recherche avant k itinéraires
+            "budget_epuise": not complet
         }
+    }
+
+    return jsonify(response)
+
+def isochrone(reseau: Graphe, depart: Station, temps_max: float) -> List[Tuple[float, int, int]]:
+    # (temps, id station, id provenance) des stations atteintes en temps_max au plus, par temps croissant ;
+    # provenance -1 pour le départ
+    temps, precedent = reseau.plus_courts_chemins(reseau.index_par_id[depart.id], temps_max)
+    atteintes = [
+        (temps[index], reseau.ids[index], reseau.ids[precedent[index]] if precedent[index] != -1 else -1)
+        for index in range(reseau.nombre_stations()) if temps[index] <= temps_max
+    ]
+    atteintes.sort()
+    return atteintes
+
+@app.route('/isochrone', methods=['GET'])
+@metriques.instrumenter("isochrone")
+def execute_isochrone():
+    courant = instantane
+    reseau = courant.reseau
+    # depart : station ; max_time : secondes ; arbre=1 : arêtes de l'arbre des plus courts chemins
+    try:
+        depart = reseau.get_station(int(request.args.get('depart')))
+        temps_max = float(request.args.get('max_time'))
+    except (TypeError, ValueError):
+        depart = None
+    if depart is None or not 0 <= temps_max < INFINI:
+        compter_erreur("isochrone")
+        return jsonify({"status": "400"})
+
+    # une recherche jusqu'au bout de la tranche sert tous les seuils de la tranche
+    tranche = math.ceil(temps_max / PAS_ISOCHRONE)
+    cle = (depart.id, tranche, courant.version)
+    atteintes = cache_isochrones.get(cle)
+    if atteintes is None:
+        with metriques.mesurer("metro_etape_duree_secondes", etape="isochrone"):
+            atteintes = isochrone(reseau, depart, tranche * PAS_ISOCHRONE)
+        cache_isochrones.put(cle, atteintes)
+    atteintes = atteintes[:bisect.bisect_right(atteintes, (temps_max, INFINI, INFINI))]
+
+    data = {
+        "depart": depart.id,
+        "max_time": temps_max,
+        "stations": [[station_id, temps] for temps, station_id, _ in atteintes]
+    }
+    if request.args.get('arbre') == '1':
+        data["aretes"] = [[id_precedent, station_id] for _, station_id, id_precedent in atteintes if id_precedent != -1]
+
+    response = {
+        "status": 200,
+        "data": data
+    }
+
+    return jsonify(response)
+
+def lire_coordonnee(valeur) -> float:
+    # ValueError pour une valeur qui n'est pas un nombre fini
+    coordonnee = float(valeur)
+    if not math.isfinite(coordonnee):
+        raise ValueError(valeur)
+    return coordonnee
+
+def lieux_proches(carte: Carte, x: float, y: float, k: int) -> List[Dict]:
+    return [
+        {"nom": lieu.nom, "x": lieu.x, "y": lieu.y, "distance": distance, "stations": list(lieu.ids)}
+        for distance, lieu in carte.plus_proches(x, y, k)
+    ]
+
+@app.route('/nearest', methods=['GET'])
+@metriques.instrumenter("nearest")
+def execute_nearest():
+    carte = instantane.carte
+    # x, y : position sur la carte (repère de pospoints.txt) ; k : nombre de stations, 1 à MAX_PLUS_PROCHES
+    try:
+        x = lire_coordonnee(request.args.get('x'))
+        y = lire_coordonnee(request.args.get('y'))
+        k = int(request.args.get('k', 1))
+    except (TypeError, ValueError):
+        k = 0
+    if not 1 <= k <= MAX_PLUS_PROCHES:
+        compter_erreur("nearest")
+        return jsonify({"status": "400"})
+
+    response = {
+        "status": 200,
+        "data": lieux_proches(carte, x, y, k)
+    }
+
+    return jsonify(response)
+
+@app.route('/nearest/batch', methods=['POST'])
+@metriques.instrumenter("nearest_batch")
+def execute_nearest_batch():
+    carte = instantane.carte
+    # corps JSON : {"points": [[x, y], ...], "k": k}
+    corps = request.get_json(silent=True) or {}
+    points = corps.get("points")
+    try:
+        k = int(corps.get("k", 1))
+    except (TypeError, ValueError):
+        k = 0
+    if not isinstance(points, list) or len(points) > MAX_POINTS_BATCH or not 1 <= k <= MAX_PLUS_PROCHES:
+        compter_erreur("nearest_batch")
+        return jsonify({"status": "400"})
+
+    resultats = []
+    for point in points:
+        try:
+            x, y = lire_coordonnee(point[0]), lire_coordonnee(point[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            resultats.append({"status": "400"})
+            continue
+        resultats.append({"x": x, "y": y, "status": 200, "proches": lieux_proches(carte, x, y, k)})
+
+    response = {
+        "status": 200,
+        "data": resultats
+    }
+
+    return jsonify(response)
+
+@app.route('/search', methods=['GET'])
+@metriques.instrumenter("search")
+def execute_search():
+    index_noms = instantane.index_noms
+    # q : début du nom (ou d'un mot du nom), sans souci des accents ni des majuscules, ou numéro de ligne
+    requete = request.args.get('q', '')
+    try:
+        limite = int(request.args.get('limit', RESULTATS_RECHERCHE))
+    except ValueError:
+        limite = 0
+    if not requete.strip() or not 1 <= limite <= MAX_RESULTATS_RECHERCHE:
+        compter_erreur("search")
+        return jsonify({"status": "400"})
+
+    response = {
+        "status": 200,
+        "data": [
+            {"name": entree.name, "stations": list(entree.ids), "lignes": list(entree.lignes)}
+            for entree in index_noms.chercher(requete, limite)
+        ]
+    }
+
+    return jsonify(response)
+
+@app.route('/dijkstra/cache', methods=['GET'])
+def execute_dijkstra_cache():
+    response = {
+        "status": 200,
+        "data": cache_dijkstra.statistiques()
+    }
+
+    return jsonify(response)
+
+@app.route('/matrix', methods=['GET'])
+@metriques.instrumenter("matrix")
+def execute_matrix():
+    reseau = instantane.reseau
+    # Récupérer les listes 'origines' et 'destinations' (ids séparés par des virgules) depuis l'URL
+    origines = lire_ids(reseau, request.args.get('origines'))
+    destinations = lire_ids(reseau, request.args.get('destinations'))
+    if (origines is None or destinations is None or len(origines) > MAX_ORIGINES_MATRICE
+            or len(destinations) > MAX_DESTINATIONS_MATRICE):
+        compter_erreur("matrix")
+        return jsonify({"status": "400"})
+
+    # un seul arbre des plus courts chemins par origine distincte remplit toute la ligne
+    lignes: Dict[int, List[Optional[int]]] = {}
+    for origine in origines:
+        if origine not in lignes:
+            temps, _ = reseau.plus_courts_chemins(reseau.index_par_id[origine])
+            lignes[origine] = [
+                None if temps[reseau.index_par_id[destination]] == INFINI else temps[reseau.index_par_id[destination]]
+                for destination in destinations
+            ]
+
+    response = {
+        "status": 200,
+        "data": {
+            "origines": origines,
+            "destinations": destinations,
+            "temps": [lignes[origine] for origine in origines]
+        }
+    }
+
+    return jsonify(response)
+
+@app.route('/dijkstra/batch', methods=['POST'])
+@metriques.instrumenter("dijkstra_batch")
+def execute_dijkstra_batch():
+    reseau = instantane.reseau
+    # corps JSON : {"paires": [[s1, s2], ...]}
+    corps = request.get_json(silent=True) or {}
+    paires = corps.get("paires")
+    if not isinstance(paires, list) or len(paires) > MAX_PAIRES_BATCH:
+        compter_erreur("dijkstra_batch")
+        return jsonify({"status": "400"})
+
+    # arbres des plus courts chemins partagés entre les paires de même origine
+    arbres: Dict[int, Tuple[List[float], List[int]]] = {}
+    resultats = []
+    for paire in paires:
+        try:
+            depart, arrivee = int(paire[0]), int(paire[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            resultats.append({"status": "400"})
+            continue
+        premiere_station = reseau.get_station(depart)
+        derniere_station = reseau.get_station(arrivee)
+        if premiere_station is None or derniere_station is None:
+            resultats.append({"s1": depart, "s2": arrivee, "status": "400"})
+            continue
+
+        index_depart = reseau.index_par_id[depart]
+        if index_depart not in arbres:
+            arbres[index_depart] = reseau.plus_courts_chemins(index_depart)
+        temps, precedent = arbres[index_depart]
+        try:
+            resultat = rendre_itineraire(
+                reseau,
+                chaine_depuis_arbre(reseau, temps, precedent, index_depart, reseau.index_par_id[arrivee]),
+                derniere_station
+            )
+        except Exception:
+            # une paire en échec ne fait pas échouer tout le lot
+            app.logger.exception(f"Itinéraire {depart} -> {arrivee} en échec")
+            resultat = {"status": "500"}
+        resultats.append({"s1": depart, "s2": arrivee, **resultat})
+
+    response = {
+        "status": 200,
+        "data": resultats
+    }
 
-    # Retourner une réponse JSON
     return jsonify(response)
 
 @app.route('/prim', methods=['GET'])
+@metriques.instrumenter("prim")
+@profileur.profiler("prim")
 def execute_prim():
+    reseau = instantane.reseau
     depart = int(request.args.get('depart'))
-    depart_station = get_station_by_id(depart, all_stations)
-    aretes = prim(depart_station)
+    depart_station = reseau.get_station(depart)
+    with metriques.mesurer("metro_etape_duree_secondes", etape="prim"):
+        aretes, poids_total = prim(reseau, depart_station)
 
     response = {
         "status": 200,
         "data": {
-            "aretes": aretes
+            "aretes": aretes,
+            "poids_total": poids_total
         }
     }
 
     return jsonify(response)
 
 @app.route('/kruskal', methods=['GET'])
+@metriques.instrumenter("kruskal")
+@profileur.profiler("kruskal")
 def execute_kruskal():
-    aretes = kruskal()
+    with metriques.mesurer("metro_etape_duree_secondes", etape="kruskal"):
+        aretes, poids_total = kruskal(instantane.reseau)
 
     response = {
         "status": 200,
         "data": {
-            "aretes": aretes
+            "aretes": aretes,
+            "poids_total": poids_total
         }
     }
 
     return jsonify(response)
 
-all_stations = create_data()
-# creer connexite
-creer_connexite()
-print("ready")
+def nombre_composantes(reseau: Graphe) -> int:
+    composantes = EnsemblesDisjoints(reseau.nombre_stations())
+    nombre = reseau.nombre_stations()
+    for index in range(reseau.nombre_stations()):
+        for index_voisin, _ in reseau.voisins_de(index):
+            if composantes.unir(index, index_voisin):
+                nombre -= 1
+    return nombre
+
+def analyse_critique(reseau: Graphe) -> Dict:
+    articulations, ponts = elements_critiques(reseau)
+    return {
+        # une station fermée (perturbations) compte comme une composante à elle seule
+        "composantes": nombre_composantes(reseau),
+        "stations": [{"id": reseau.ids[index], "name": reseau.stations[index].name} for index in articulations],
+        "aretes": [
+            {"start": reseau.ids[index], "end": reseau.ids[index_voisin], "time": poids_arc(reseau, index, index_voisin)}
+            for index, index_voisin in ponts
+        ]
+    }
+
+@app.route('/analysis/critical', methods=['GET'])
+@metriques.instrumenter("analysis_critical")
+def execute_analysis_critical():
+    courant = instantane
+    cle = ("critical", courant.version)
+    data = cache_analyses.get(cle)
+    if data is None:
+        with metriques.mesurer("metro_etape_duree_secondes", etape="critical"):
+            data = analyse_critique(courant.reseau)
+        cache_analyses.put(cle, data)
+
+    response = {
+        "status": 200,
+        "data": {"version": courant.version, **data}
+    }
+
+    return jsonify(response)
+
+def lancer_centralite(courant: Instantane) -> bool:
+    # calcul dans un thread, réparti entre NB_PROCESSUS_CENTRALITE processus ; False si un calcul est déjà en cours
+    if not verrou_centralite.acquire(blocking=False):
+        return False
+    calcul_centralite.update(version=courant.version, etat="en cours", erreur=None, duree_secondes=None)
+    threading.Thread(target=calculer_centralite, args=(courant,), daemon=True).start()
+    return True
+
+def calculer_centralite(courant: Instantane) -> None:
+    debut = time.perf_counter()
+    reseau = courant.reseau
+    try:
+        with metriques.mesurer("metro_etape_duree_secondes", etape="centrality"):
+            intermediarite, proximite = centralites(reseau, NB_PROCESSUS_CENTRALITE)
+        stations = [
+            {"id": reseau.ids[index], "name": station.name,
+             "intermediarite": intermediarite[index], "proximite": proximite[index]}
+            for index, station in enumerate(reseau.stations)
+        ]
+        # pôles de correspondance en tête
+        stations.sort(key=lambda entree: (-entree["intermediarite"], entree["id"]))
+        cache_analyses.put(("centrality", courant.version), {"stations": stations})
+        calcul_centralite.update(etat="termine", duree_secondes=time.perf_counter() - debut)
+    except Exception as erreur:
+        app.logger.exception("Calcul des centralités en échec")
+        calcul_centralite.update(etat="erreur", erreur=str(erreur), duree_secondes=time.perf_counter() - debut)
+    finally:
+        verrou_centralite.release()
+
+@app.route('/analysis/centrality', methods=['GET'])
+@metriques.instrumenter("analysis_centrality")
+def execute_analysis_centrality():
+    courant = instantane
+    # limite : nombre de stations renvoyées, les plus centrales d'abord (toutes par défaut)
+    try:
+        limite = int(request.args.get('limite', courant.reseau.nombre_stations()))
+    except ValueError:
+        limite = 0
+    if limite < 1:
+        compter_erreur("analysis_centrality")
+        return jsonify({"status": "400"})
+
+    data = cache_analyses.get(("centrality", courant.version))
+    if data is None:
+        # pas encore calculé pour cette version : calcul lancé en arrière-plan, à redemander plus tard
+        lancer_centralite(courant)
+        return jsonify({"status": 202, "data": {"version": courant.version, "calcul": dict(calcul_centralite)}})
+
+    response = {
+        "status": 200,
+        "data": {"version": courant.version, "stations": data["stations"][:limite]}
+    }
+
+    return jsonify(response)
+
+@app.route('/network', methods=['GET'])
+@metriques.instrumenter("network")
+def execute_network():
+    export = instantane.export
+    # ETag fort, propre à chaque codage : 304 sans corps si le client a déjà cette version dans ce codage ;
+    # corps gzip si le client l'accepte
+    compresse = request.accept_encodings["gzip"] > 0
+    etag = export.version + SUFFIXE_GZIP if compresse else export.version
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    elif compresse:
+        response = app.response_class(export.corps_gzip, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = app.response_class(export.corps, mimetype="application/json")
+    response.set_etag(etag)
+    # le navigateur revalide à chaque chargement de page
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+@app.route('/network/delta', methods=['GET'])
+@metriques.instrumenter("network_delta")
+def execute_network_delta():
+    export = instantane.export
+    # depuis : version (ou ETag) du réseau que le client a déjà ; "410" si elle n'est plus connue, /network complet
+    depuis = lire_version(request.args.get('depuis'))
+    ancien = export if depuis == export.version else exports_precedents.get(depuis)
+    if ancien is None:
+        compter_erreur("network_delta")
+        return jsonify({"status": "410"})
+
+    response = {
+        "status": 200,
+        "data": delta_export(ancien, export)
+    }
+
+    return jsonify(response)
+
+@app.route('/metrics', methods=['GET'])
+def execute_metrics():
+    # format texte de Prometheus
+    return app.response_class(metriques.exporter(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/reload', methods=['POST'])
+def execute_reload():
+    # relit metro.txt en arrière-plan ; les requêtes continuent sur l'instantané courant jusqu'à l'échange
+    lance = lancer_rechargement(lambda: recharger_reseau(depuis_texte=True))
+    response = {
+        "status": 202 if lance else "409",
+        "data": {"version": instantane.version, **dernier_rechargement}
+    }
+
+    return jsonify(response)
+
+@app.route('/reload', methods=['GET'])
+def execute_reload_etat():
+    response = {
+        "status": 200,
+        "data": {"version": instantane.version, **dernier_rechargement}
+    }
+
+    return jsonify(response)
+
+@app.route('/perturbations', methods=['GET'])
+def execute_perturbations():
+    courant = instantane
+    response = {
+        "status": 200,
+        "data": {"version": courant.version, **courant.perturbations.vers_json()}
+    }
+
+    return jsonify(response)
+
+@app.route('/perturbations', methods=['POST'])
+@metriques.instrumenter("perturbations")
+def execute_perturbations_modifier():
+    # corps JSON, tous les champs sont facultatifs :
+    #   {"fermer_stations": [id, ...], "rouvrir_stations": [id, ...],
+    #    "fermer_aretes": [[s1, s2], ...], "rouvrir_aretes": [[s1, s2], ...],
+    #    "temps": [[s1, s2, secondes], ...]}       secondes à null : retour au temps de metro.txt
+    corps = request.get_json(silent=True)
+    # une modification à la fois, tous processus confondus : chacune part du fichier laissé par la précédente,
+    # pas des perturbations de ce processus, qui peut ne pas encore avoir relu une modification d'un autre worker
+    with verrou_perturbations, verrou_fichier(FICHIER_PERTURBATIONS):
+        courant = instantane
+        try:
+            perturbations = modifier_perturbations(courant, lire_perturbations(FICHIER_PERTURBATIONS), corps)
+        except (TypeError, ValueError, IndexError, AttributeError):
+            compter_erreur("perturbations")
+            return jsonify({"status": "400"})
+        return jsonify(publier_perturbations(courant, perturbations))
+
+@app.route('/perturbations', methods=['DELETE'])
+@metriques.instrumenter("perturbations")
+def execute_perturbations_supprimer():
+    # tout le réseau rouvert, temps de metro.txt
+    with verrou_perturbations, verrou_fichier(FICHIER_PERTURBATIONS):
+        return jsonify(publier_perturbations(instantane, Perturbations()))
+
+@app.before_request
+def verifier_fichiers():
+    # Un autre processus (worker gunicorn) a réécrit le snapshot binaire après POST /reload, ou
+    # Data/perturbations.json : on le relit à notre tour, en arrière-plan, au plus une fois toutes les
+    # SECONDES_ENTRE_VERIFICATIONS
+    global derniere_verification
+    maintenant = time.monotonic()
+    if maintenant - derniere_verification < SECONDES_ENTRE_VERIFICATIONS:
+        return
+    derniere_verification = maintenant
+    courant = instantane
+    date = date_fichier(FICHIER_SNAPSHOT)
+    if date != 0 and date != courant.date_snapshot:
+        lancer_rechargement(lambda: recharger_reseau(depuis_texte=False))
+    elif date_fichier(FICHIER_PERTURBATIONS) != courant.date_perturbations:
+        lancer_rechargement(relire_perturbations)
+
+def charger_depuis_texte(metro_path: str = FICHIER_METRO, positions_path: str = FICHIER_POSITIONS) -> Graphe:
+    stations = create_data(metro_path)
+    # creer connexite
+    creer_connexite(stations)
+    # index id -> station et voisins à plat, construits une fois les voisins définitifs
+    return construire_graphe(stations, charger_positions(positions_path))
+
+def graphe_depuis_snapshot(contenu: Dict) -> Graphe:
+    # les tableaux restent ceux projetés en mémoire, seules les stations sont recréées
+    stations = tuple(Station(station_id, name, lignes, terminus, []) for station_id, name, lignes, terminus in contenu["stations"])
+    graphe = Graphe(
+        stations, MappingProxyType({station.id: index for index, station in enumerate(stations)}), contenu["ids"],
+        contenu["debut_voisins"], contenu["voisins"], contenu["poids"],
+        contenu["pos_x"], contenu["pos_y"], contenu["facteur_heuristique"]
+    )
+    for index, station in enumerate(stations):
+        station.voisins = [(stations[index_voisin], temps) for index_voisin, temps in graphe.voisins_de(index)]
+    return graphe
+
+def date_fichier(file_path: str) -> int:
+    # date de modification en ns, 0 si le fichier n'existe pas
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except OSError:
+        return 0
+
+def charger_reseau(depuis_texte: bool = False) -> Graphe:
+    # snapshot binaire (python snapshot.py) s'il correspond encore aux fichiers texte, sinon lecture du texte
+    # depuis_texte : relit le texte et réécrit le snapshot, que les autres processus relisent à leur tour
+    empreinte = empreinte_sources(FICHIER_METRO, FICHIER_POSITIONS)
+    contenu = None if depuis_texte else lire_snapshot(FICHIER_SNAPSHOT, empreinte)
+    if contenu is not None:
+        return graphe_depuis_snapshot(contenu)
+    graphe = charger_depuis_texte()
+    if depuis_texte:
+        try:
+            ecrire_snapshot(graphe, FICHIER_SNAPSHOT, empreinte)
+        except OSError as erreur:
+            print(f"Snapshot du graphe non écrit : {erreur}")
+    return graphe
+
+def charger_instantane(depuis_texte: bool = False) -> Instantane:
+    # graphe de metro.txt, sans perturbation
+    reseau = charger_reseau(depuis_texte)
+    return Instantane(reseau, charger_table_routes(FICHIER_ROUTES, reseau), reseau.empreinte_complete(),
+                      date_fichier(FICHIER_SNAPSHOT), Perturbations(), 0, construire_carte(reseau),
+                      charger_hierarchie(FICHIER_HIERARCHIE, reseau), construire_export(reseau),
+                      IndexNoms(reseau.stations))
+
+def instantane_perturbe(courant: Instantane, perturbations: Perturbations, date_perturbations: int) -> Instantane:
+    # même graphe de metro.txt et même table précalculée que courant, avec d'autres perturbations
+    reference = courant.reseau.reference or courant.reseau
+    table = courant.table_routes.table if isinstance(courant.table_routes, TableReparee) else courant.table_routes
+    perturbations = perturbations_valides(reference, perturbations)
+    if perturbations.vide():
+        reseau, table_routes = reference, table
+    else:
+        reseau = appliquer_perturbations(reference, perturbations)
+        # lignes de la table réparées au premier besoin, seulement pour les départs concernés
+        table_routes = None if table is None else TableReparee(table, reseau, arcs_modifies(reference, reseau))
+    # la hiérarchie ne vaut que pour le graphe de metro.txt : rechargée avec lui, gardée tant qu'il n'est pas perturbé
+    hierarchie = courant.hierarchie if reseau is reference else None
+    if hierarchie is None and reseau is reference and courant.reseau is not reference:
+        hierarchie = charger_hierarchie(FICHIER_HIERARCHIE, reference)
+    return Instantane(reseau, table_routes, reseau.empreinte_complete(), courant.date_snapshot,
+                      perturbations, date_perturbations, courant.carte, hierarchie, construire_export(reseau),
+                      courant.index_noms)
+
+def recharger_reseau(depuis_texte: bool) -> Instantane:
+    # nouveau graphe de metro.txt, perturbations en cours réappliquées
+    # (date lue avant le contenu : une écriture entre les deux sera vue à la vérification suivante)
+    date_perturbations = date_fichier(FICHIER_PERTURBATIONS)
+    return instantane_perturbe(charger_instantane(depuis_texte), lire_perturbations(FICHIER_PERTURBATIONS),
+                               date_perturbations)
+
+def relire_perturbations() -> Instantane:
+    date_perturbations = date_fichier(FICHIER_PERTURBATIONS)
+    return instantane_perturbe(instantane, lire_perturbations(FICHIER_PERTURBATIONS), date_perturbations)
+
+def modifier_perturbations(courant: Instantane, enregistrees: Perturbations, corps: Dict) -> Perturbations:
+    # perturbations enregistrées (Data/perturbations.json) modifiées par le corps de POST /perturbations ;
+    # ValueError si une station ou une arête n'existe pas dans metro.txt
+    reference = courant.reseau.reference or courant.reseau
+    aretes = aretes_du_graphe(reference)
+
+    def station(valeur) -> int:
+        station_id = int(valeur)
+        if station_id not in reference.index_par_id:
+            raise ValueError(f"station {station_id} inconnue")
+        return station_id
+
+    def arete(valeur) -> Tuple[int, int]:
+        cle = cle_arete(station(valeur[0]), station(valeur[1]))
+        if cle not in aretes:
+            raise ValueError(f"arête {cle} inconnue")
+        return cle
+
+    actuelles = perturbations_valides(reference, enregistrees)
+    stations_fermees = set(actuelles.stations_fermees) | {station(valeur) for valeur in corps.get("fermer_stations", ())}
+    stations_fermees -= {station(valeur) for valeur in corps.get("rouvrir_stations", ())}
+    aretes_fermees = set(actuelles.aretes_fermees) | {arete(valeur) for valeur in corps.get("fermer_aretes", ())}
+    aretes_fermees -= {arete(valeur) for valeur in corps.get("rouvrir_aretes", ())}
+    temps = dict(actuelles.temps)
+    for valeur in corps.get("temps", ()):
+        cle = arete(valeur)
+        if valeur[2] is None:
+            temps.pop(cle, None)
+        elif int(valeur[2]) < 0:
+            raise ValueError(f"temps négatif : {valeur[2]}")
+        else:
+            temps[cle] = int(valeur[2])
+    return Perturbations(frozenset(stations_fermees), frozenset(aretes_fermees), MappingProxyType(temps))
+
+def publier_perturbations(courant: Instantane, perturbations: Perturbations) -> Dict:
+    # fichier d'abord (relu par les autres processus), puis échange de l'instantané dans ce processus
+    try:
+        ecrire_perturbations(FICHIER_PERTURBATIONS, perturbations)
+    except OSError as erreur:
+        print(f"Perturbations non enregistrées : {erreur}")
+    nouveau = instantane_perturbe(courant, perturbations, date_fichier(FICHIER_PERTURBATIONS))
+    echanger(nouveau)
+    return {
+        "status": 200,
+        "data": {"version": nouveau.version, **nouveau.perturbations.vers_json()}
+    }
+
+def reporter_cache(ancien: Instantane, nouveau: Instantane) -> None:
+    # Une réponse /dijkstra reste juste quand la nouvelle version ne fait que rallonger ou fermer des arcs que
+    # son trajet n'emprunte pas : elle est recopiée sous la nouvelle version au lieu d'être recalculée.
+    # Les entrées de l'ancienne version restent en cache : elles resservent si les perturbations sont levées.
+    reference = ancien.reseau.reference or ancien.reseau
+    if reference is not (nouveau.reseau.reference or nouveau.reseau):
+        # autre metro.txt : les index des stations ne se correspondent plus
+        cache_dijkstra.vider()
+        cache_isochrones.vider()
+        cache_analyses.vider()
+        return
+    modifies = arcs_modifies(ancien.reseau, nouveau.reseau)
+    if any(apres < avant for avant, apres in modifies.values()):
+        # un arc raccourci ou rouvert peut améliorer n'importe quel trajet
+        return
+    ids = nouveau.reseau.ids
+    aretes = {(ids[u], ids[v]) for u, v in modifies}
+
+    def nouvelle_cle(cle, valeur):
+        if cle[3] != ancien.version or any(arete in aretes for arete in valeur[2]):
+            return None
+        return cle[:3] + (nouveau.version,)
+
+    cache_dijkstra.dupliquer(nouvelle_cle)
+
+def echanger(nouveau: Instantane) -> None:
+    global instantane
+    ancien = instantane
+    # échange atomique : les requêtes en cours gardent l'ancien instantané jusqu'à leur fin
+    instantane = nouveau
+    if nouveau.version != ancien.version:
+        reporter_cache(ancien, nouveau)
+    if nouveau.export.version != ancien.export.version:
+        exports_precedents.put(ancien.export.version, ancien.export)
+
+# un seul rechargement à la fois par processus ; le verrou est rendu par le thread de rechargement
+verrou_rechargement = threading.Lock()
+verrou_perturbations = threading.Lock()
+verrou_centralite = threading.Lock()
+calcul_centralite: Dict = {"version": None, "etat": "aucun", "erreur": None, "duree_secondes": None}
+dernier_rechargement: Dict = {"etat": "aucun", "erreur": None, "duree_secondes": None}
+derniere_verification = time.monotonic()
+
+def lancer_rechargement(construire: Callable[[], Instantane]) -> bool:
+    # construire() est appelé dans un thread ; False si un rechargement est déjà en cours
+    if not verrou_rechargement.acquire(blocking=False):
+        return False
+    dernier_rechargement.update(etat="en cours", erreur=None, duree_secondes=None)
+    threading.Thread(target=recharger, args=(construire,), daemon=True).start()
+    return True
+
+def recharger(construire: Callable[[], Instantane]) -> None:
+    debut = time.perf_counter()
+    try:
+        nouveau = construire()
+        echanger(nouveau)
+        dernier_rechargement.update(etat="termine", duree_secondes=time.perf_counter() - debut)
+        metriques.incrementer("metro_rechargements_total", resultat="ok")
+        print(f"Réseau rechargé : {nouveau.reseau.nombre_stations()} stations, version {nouveau.version}")
+    except Exception as erreur:
+        # fichier invalide (ErreurFormat) ou illisible : l'instantané courant reste en service
+        app.logger.exception("Rechargement du réseau en échec")
+        dernier_rechargement.update(etat="erreur", erreur=str(erreur), duree_secondes=time.perf_counter() - debut)
+        metriques.incrementer("metro_rechargements_total", resultat="erreur")
+    finally:
+        verrou_rechargement.release()
+
+# les processus de calcul des centralités (spawn, voir analyse.centralites) réimportent ce fichier sous le nom
+# __mp_main__ quand le serveur est lancé par python graphe.py : ils n'ont pas besoin du réseau
+if __name__ != '__mp_main__':
+    instantane = recharger_reseau(depuis_texte=False)
+    # objets du chargement initial exclus du ramasse-miettes : avec gunicorn --preload, leurs pages restent
+    # partagées entre les workers forkés au lieu d'être recopiées au premier passage du GC
+    gc.freeze()
+    print("ready")
 
 if __name__ == '__main__':
     app.run(debug=True)
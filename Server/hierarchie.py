@@ -0,0 +1,337 @@
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graphe import Graphe, Station
+
+# Hiérarchie de contraction (contraction hierarchies) pour les grands réseaux : python hierarchie.py
+# Les stations sont contractées une à une ; contracter v remplace chaque chemin u -> v -> w qui est le seul
+# plus court chemin de u à w par un raccourci u -> w de même temps (milieu v). Un plus court chemin se trouve
+# ensuite par deux recherches qui ne montent que vers des stations contractées plus tard.
+#
+# Fichier : en-tête puis huit tableaux d'entiers 32 bits little-endian
+#   debut_haut, cible_haut, poids_haut, milieu_haut   arcs v -> cible vers une station de rang supérieur (CSR)
+#   debut_bas, source_bas, poids_bas, milieu_bas      arcs source -> v depuis une station de rang supérieur (CSR)
+#   milieu : station contractée que le raccourci remplace, -1 pour un arc de metro.txt
+MAGIQUE = b"CHIE"
+VERSION = 1
+# magique, version, nombre de stations, empreinte du graphe, nombre d'arcs montants, nombre d'arcs descendants
+EN_TETE = struct.Struct("<4sIIIII")
+INFINI = float("inf")
+
+# stations traitées au plus par recherche de témoin : au-delà, le raccourci est ajouté sans preuve qu'il est inutile
+LIMITE_TEMOINS = 60
+# poids de la différence d'arcs dans la priorité de contraction
+POIDS_DIFFERENCE = 2
+
+# v -> {voisin : (poids, milieu)}
+Arcs = List[Dict[int, Tuple[int, int]]]
+
+
+def temoins(sortants: Arcs, source: int, exclue: int, cibles: Dict[int, int]) -> Dict[int, float]:
+    # Dijkstra local depuis source sans passer par exclue, arrêté quand toutes les cibles sont traitées,
+    # au-delà du plus grand temps de cibles ou après LIMITE_TEMOINS stations
+    borne = max(cibles.values())
+    restantes = set(cibles)
+    temps: Dict[int, float] = {source: 0}
+    tas: List[Tuple[float, int]] = [(0, source)]
+    traitees = 0
+    while tas:
+        temps_current, current = heapq.heappop(tas)
+        if temps_current > temps[current]:
+            continue
+        if temps_current > borne:
+            break
+        restantes.discard(current)
+        traitees += 1
+        if not restantes or traitees > LIMITE_TEMOINS:
+            break
+        for voisin, (poids, _) in sortants[current].items():
+            if voisin == exclue:
+                continue
+            nouveau_temps = temps_current + poids
+            if nouveau_temps < temps.get(voisin, INFINI):
+                temps[voisin] = nouveau_temps
+                heapq.heappush(tas, (nouveau_temps, voisin))
+    return temps
+
+
+def raccourcis(sortants: Arcs, entrants: Arcs, v: int) -> List[Tuple[int, int, int]]:
+    # (u, w, poids) des raccourcis qu'exige la contraction de v
+    resultat = []
+    for u, (poids_uv, _) in entrants[v].items():
+        cibles = {w: poids_uv + poids_vw for w, (poids_vw, _) in sortants[v].items() if w != u}
+        if not cibles:
+            continue
+        temps = temoins(sortants, u, v, cibles)
+        for w, poids in cibles.items():
+            # un chemin témoin de même temps suffit : le raccourci n'apporterait rien
+            if temps.get(w, INFINI) > poids:
+                resultat.append((u, w, poids))
+    return resultat
+
+
+def construire_hierarchie(graphe: "Graphe") -> Dict[str, array]:
+    n = graphe.nombre_stations()
+    sortants: Arcs = [{} for _ in range(n)]
+    entrants: Arcs = [{} for _ in range(n)]
+    # arcs parallèles : seul le plus court compte
+    for v in range(n):
+        for voisin, poids in graphe.voisins_de(v):
+            if voisin != v and poids < sortants[v].get(voisin, (INFINI,))[0]:
+                sortants[v][voisin] = (poids, -1)
+                entrants[voisin][v] = (poids, -1)
+
+    # priorité : raccourcis ajoutés moins arcs retirés, plus les voisins déjà contractés et le niveau dans la
+    # hiérarchie (répartissent les contractions sur tout le réseau et gardent la hiérarchie peu profonde)
+    voisins_contractes = [0] * n
+    niveau = [0] * n
+
+    def priorite(v: int, nb_raccourcis: int) -> int:
+        return (POIDS_DIFFERENCE * (nb_raccourcis - len(sortants[v]) - len(entrants[v]))
+                + voisins_contractes[v] + niveau[v])
+
+    # nombre de raccourcis de la dernière simulation de contraction, recalculé quand la station sort du tas
+    nb_raccourcis = [len(raccourcis(sortants, entrants, v)) for v in range(n)]
+    priorites = [priorite(v, nb_raccourcis[v]) for v in range(n)]
+    tas = [(priorites[v], v) for v in range(n)]
+    heapq.heapify(tas)
+    contractee = bytearray(n)
+    haut: List[List[Tuple[int, int, int]]] = [[] for _ in range(n)]
+    bas: List[List[Tuple[int, int, int]]] = [[] for _ in range(n)]
+    while tas:
+        priorite_tas, v = heapq.heappop(tas)
+        if contractee[v] or priorite_tas != priorites[v]:
+            continue
+        # priorité recalculée au dernier moment : v attend si elle a monté au-dessus de la suivante
+        a_ajouter = raccourcis(sortants, entrants, v)
+        nb_raccourcis[v] = len(a_ajouter)
+        priorites[v] = priorite(v, nb_raccourcis[v])
+        if tas and priorites[v] > tas[0][0]:
+            heapq.heappush(tas, (priorites[v], v))
+            continue
+
+        for u, w, poids in a_ajouter:
+            if poids < sortants[u].get(w, (INFINI,))[0]:
+                sortants[u][w] = (poids, v)
+                entrants[w][u] = (poids, v)
+        # les voisins restants seront tous contractés après v
+        haut[v] = [(w, poids, milieu) for w, (poids, milieu) in sortants[v].items()]
+        bas[v] = [(u, poids, milieu) for u, (poids, milieu) in entrants[v].items()]
+        voisins = set(sortants[v]) | set(entrants[v])
+        for w in sortants[v]:
+            del entrants[w][v]
+        for u in entrants[v]:
+            del sortants[u][v]
+        sortants[v] = {}
+        entrants[v] = {}
+        contractee[v] = 1
+        # seules les priorités des voisins changent ; leurs raccourcis ne sont simulés à nouveau qu'à leur sortie du tas
+        for voisin in voisins:
+            voisins_contractes[voisin] += 1
+            niveau[voisin] = max(niveau[voisin], niveau[v] + 1)
+            priorites[voisin] = priorite(voisin, nb_raccourcis[voisin])
+            heapq.heappush(tas, (priorites[voisin], voisin))
+
+    tableaux = {}
+    for nom, arcs in (("haut", haut), ("bas", bas)):
+        debut = array("i", [0])
+        autre, poids, milieu = array("i"), array("i"), array("i")
+        for v in range(n):
+            for station, poids_arc, milieu_arc in arcs[v]:
+                autre.append(station)
+                poids.append(poids_arc)
+                milieu.append(milieu_arc)
+            debut.append(len(autre))
+        tableaux[f"debut_{nom}"] = debut
+        tableaux["cible_haut" if nom == "haut" else "source_bas"] = autre
+        tableaux[f"poids_{nom}"] = poids
+        tableaux[f"milieu_{nom}"] = milieu
+    return tableaux
+
+
+ORDRE_TABLEAUX = ("debut_haut", "cible_haut", "poids_haut", "milieu_haut",
+                  "debut_bas", "source_bas", "poids_bas", "milieu_bas")
+
+
+@dataclass
+class Hierarchie:
+    n: int
+    debut_haut: memoryview
+    cible_haut: memoryview
+    poids_haut: memoryview
+    milieu_haut: memoryview
+    debut_bas: memoryview
+    source_bas: memoryview
+    poids_bas: memoryview
+    milieu_bas: memoryview
+    # projection du fichier, gardée ouverte tant que les tableaux s'y réfèrent
+    fichier_mmap: mmap.mmap
+
+    def arc(self, a: int, b: int) -> Tuple[int, int]:
+        # (poids, milieu) de l'arc a -> b, -1 pour milieu si c'est un arc de metro.txt. Cherché dans les arcs
+        # montants de a, sinon dans les arcs descendants vers b : quelques arcs par station, et rien à construire
+        # au chargement, les tableaux restent ceux du fichier projeté (pages partagées entre processus)
+        meilleur: Optional[Tuple[int, int]] = None
+        for k in range(self.debut_haut[a], self.debut_haut[a + 1]):
+            if self.cible_haut[k] == b and (meilleur is None or self.poids_haut[k] < meilleur[0]):
+                meilleur = (self.poids_haut[k], self.milieu_haut[k])
+        if meilleur is not None:
+            return meilleur
+        for k in range(self.debut_bas[b], self.debut_bas[b + 1]):
+            if self.source_bas[k] == a and (meilleur is None or self.poids_bas[k] < meilleur[0]):
+                meilleur = (self.poids_bas[k], self.milieu_bas[k])
+        if meilleur is None:
+            raise KeyError((a, b))
+        return meilleur
+
+    def recherche(self, index_depart: int, index_arrivee: int) -> Optional[List[int]]:
+        # Dijkstra bidirectionnel montant : index des stations du chemin dans la hiérarchie (raccourcis compris)
+        temps_avant: Dict[int, float] = {index_depart: 0}
+        temps_arriere: Dict[int, float] = {index_arrivee: 0}
+        precedent: Dict[int, int] = {index_depart: -1}
+        suivant: Dict[int, int] = {index_arrivee: -1}
+        tas_avant: List[Tuple[float, int]] = [(0, index_depart)]
+        tas_arriere: List[Tuple[float, int]] = [(0, index_arrivee)]
+        meilleur = INFINI
+        rencontre = -1
+        while tas_avant or tas_arriere:
+            haut_avant = tas_avant[0][0] if tas_avant else INFINI
+            haut_arriere = tas_arriere[0][0] if tas_arriere else INFINI
+            # chaque recherche s'arrête d'elle-même au-delà du meilleur temps trouvé
+            if min(haut_avant, haut_arriere) >= meilleur:
+                break
+            if haut_avant <= haut_arriere:
+                temps_current, current = heapq.heappop(tas_avant)
+                if temps_current > temps_avant[current]:
+                    continue
+                if current in temps_arriere and temps_current + temps_arriere[current] < meilleur:
+                    meilleur = temps_current + temps_arriere[current]
+                    rencontre = current
+                for k in range(self.debut_haut[current], self.debut_haut[current + 1]):
+                    voisin = self.cible_haut[k]
+                    nouveau_temps = temps_current + self.poids_haut[k]
+                    if nouveau_temps < temps_avant.get(voisin, INFINI):
+                        temps_avant[voisin] = nouveau_temps
+                        precedent[voisin] = current
+                        heapq.heappush(tas_avant, (nouveau_temps, voisin))
+            else:
+                temps_current, current = heapq.heappop(tas_arriere)
+                if temps_current > temps_arriere[current]:
+                    continue
+                if current in temps_avant and temps_current + temps_avant[current] < meilleur:
+                    meilleur = temps_current + temps_avant[current]
+                    rencontre = current
+                for k in range(self.debut_bas[current], self.debut_bas[current + 1]):
+                    voisin = self.source_bas[k]
+                    nouveau_temps = temps_current + self.poids_bas[k]
+                    if nouveau_temps < temps_arriere.get(voisin, INFINI):
+                        temps_arriere[voisin] = nouveau_temps
+                        suivant[voisin] = current
+                        heapq.heappush(tas_arriere, (nouveau_temps, voisin))
+        if rencontre == -1:
+            return None
+
+        chemin = []
+        current = rencontre
+        while current != -1:
+            chemin.append(current)
+            current = precedent[current]
+        chemin.reverse()
+        current = suivant[rencontre]
+        while current != -1:
+            chemin.append(current)
+            current = suivant[current]
+        return chemin
+
+    def deplier(self, chemin: List[int]) -> List[Tuple[int, int]]:
+        # arcs de metro.txt (index, poids depuis la station précédente) du chemin, raccourcis remplacés par leur milieu
+        stations = [(chemin[0], 0)]
+        pile = list(reversed(list(zip(chemin, chemin[1:]))))
+        while pile:
+            a, b = pile.pop()
+            poids, milieu = self.arc(a, b)
+            if milieu == -1:
+                stations.append((b, poids))
+            else:
+                pile.append((milieu, b))
+                pile.append((a, milieu))
+        return stations
+
+    def chemin(self, graphe: "Graphe", depart: "Station", arrivee: "Station") -> Optional[Dict[int, Tuple[int, int]]]:
+        # Même format que dijkstra() : id station -> (id provenance, temps depuis le départ), limité au trajet
+        if depart.id == arrivee.id:
+            return {}
+        chemin = self.recherche(graphe.index_par_id[depart.id], graphe.index_par_id[arrivee.id])
+        if chemin is None:
+            return None
+        stations: Dict[int, Tuple[int, int]] = {}
+        temps = 0
+        etapes = self.deplier(chemin)
+        for (index_precedent, _), (index, poids) in zip(etapes, etapes[1:]):
+            temps += poids
+            stations[graphe.ids[index]] = (graphe.ids[index_precedent], temps)
+        return stations
+
+
+def ecrire_hierarchie(graphe: "Graphe", file_path: str) -> None:
+    n = graphe.nombre_stations()
+    tableaux = construire_hierarchie(graphe)
+    if sys.byteorder != "little":
+        for tableau in tableaux.values():
+            tableau.byteswap()
+    # écrit à côté puis renommé : les serveurs qui projettent l'ancienne hiérarchie en mémoire la gardent intacte
+    fichier_temporaire = f"{file_path}.{os.getpid()}.tmp"
+    with open(fichier_temporaire, "wb") as file:
+        file.write(EN_TETE.pack(MAGIQUE, VERSION, n, graphe.empreinte(),
+                                len(tableaux["cible_haut"]), len(tableaux["source_bas"])))
+        for nom in ORDRE_TABLEAUX:
+            tableaux[nom].tofile(file)
+    os.replace(fichier_temporaire, file_path)
+    nb_raccourcis = sum(1 for nom in ("milieu_haut", "milieu_bas") for milieu in tableaux[nom] if milieu != -1)
+    print(f"Hiérarchie de contraction sauvegardée sous {file_path} ({n} stations, {nb_raccourcis} raccourcis)")
+
+
+def charger_hierarchie(file_path: str, graphe: "Graphe") -> Optional[Hierarchie]:
+    # Projette le fichier en mémoire ; None si absent ou périmé
+    if sys.byteorder != "little":
+        return None
+    try:
+        with open(file_path, "rb") as file:
+            fichier_mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    n = graphe.nombre_stations()
+    if len(fichier_mmap) < EN_TETE.size:
+        fichier_mmap.close()
+        return None
+    magique, version, n_fichier, empreinte, m_haut, m_bas = EN_TETE.unpack_from(fichier_mmap, 0)
+    tailles = (n + 1, m_haut, m_haut, m_haut, n + 1, m_bas, m_bas, m_bas)
+    if (magique != MAGIQUE or version != VERSION or n_fichier != n or empreinte != graphe.empreinte()
+            or len(fichier_mmap) != EN_TETE.size + 4 * sum(tailles)):
+        print(f"Hiérarchie de contraction périmée, ignorée : {file_path}")
+        fichier_mmap.close()
+        return None
+
+    vue = memoryview(fichier_mmap)
+    tableaux = []
+    position = EN_TETE.size
+    for taille in tailles:
+        tableaux.append(vue[position:position + 4 * taille].cast("i"))
+        position += 4 * taille
+    return Hierarchie(n, *tableaux, fichier_mmap=fichier_mmap)
+
+
+if __name__ == '__main__':
+    import graphe
+
+    reseau = graphe.instantane.reseau
+    # hiérarchie du graphe de metro.txt, pas d'une version perturbée
+    ecrire_hierarchie(reseau.reference or reseau, graphe.FICHIER_HIERARCHIE)
@@ -0,0 +1,86 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graphe import Station
+
+# Index des noms de stations pour /search : tableau trié des noms normalisés (sans accents, en minuscules,
+# ponctuation remplacée par des espaces) et de chacun de leurs suffixes commençant à un mot. Les stations
+# d'un même nom (une par ligne dans metro.txt) forment une seule entrée.
+
+# rang d'une correspondance, du meilleur au moins bon
+NOM_EXACT, DEBUT_NOM, DEBUT_MOT, LIGNE = range(4)
+
+
+def normaliser(texte: str) -> str:
+    # "Saint-Germain-des-Prés" -> "saint germain des pres"
+    sans_accents = "".join(c for c in unicodedata.normalize("NFKD", texte) if not unicodedata.combining(c))
+    return " ".join(re.split(r"[^0-9a-z]+", sans_accents.lower())).strip()
+
+
+def cle_ligne(ligne: str) -> Tuple[int, str]:
+    # ordre naturel : 3, 3bis, 4, ..., 10
+    chiffres = re.match(r"\d*", ligne).group()
+    return (int(chiffres) if chiffres else 0, ligne[len(chiffres):])
+
+
+@dataclass(frozen=True)
+class EntreeNom:
+    name: str
+    ids: Tuple[int, ...]
+    lignes: Tuple[str, ...]
+
+
+class IndexNoms:
+    def __init__(self, stations: Iterable["Station"]):
+        ids_par_nom: Dict[str, List[int]] = {}
+        lignes_par_nom: Dict[str, set] = {}
+        for station in stations:
+            ids_par_nom.setdefault(station.name, []).append(station.id)
+            lignes_par_nom.setdefault(station.name, set()).update(station.lignes)
+        self.entrees = [
+            EntreeNom(nom, tuple(ids), tuple(sorted(lignes_par_nom[nom], key=cle_ligne)))
+            for nom, ids in ids_par_nom.items()
+        ]
+        self.noms = [normaliser(entree.name) for entree in self.entrees]
+
+        # (clé, rang si la clé est un préfixe de la requête, index de l'entrée), trié par clé
+        cles: List[Tuple[str, int, int]] = []
+        for index, nom in enumerate(self.noms):
+            cles.append((nom, DEBUT_NOM, index))
+            for debut_mot in (position + 1 for position, c in enumerate(nom) if c == " "):
+                cles.append((nom[debut_mot:], DEBUT_MOT, index))
+        cles.sort()
+        self.cles = [cle for cle, _, _ in cles]
+        self.rangs = [rang for _, rang, _ in cles]
+        self.index_entrees = [index for _, _, index in cles]
+        # ligne normalisée ("7bis") -> index des entrées qui la desservent
+        self.par_ligne: Dict[str, List[int]] = {}
+        for index, entree in enumerate(self.entrees):
+            for ligne in entree.lignes:
+                self.par_ligne.setdefault(normaliser(ligne), []).append(index)
+
+    def chercher(self, requete: str, limite: int) -> List[EntreeNom]:
+        # les limite meilleures entrées : nom exact, puis début du nom, puis début d'un mot, puis numéro de ligne ;
+        # à rang égal, le nom le plus court puis l'ordre alphabétique
+        prefixe = normaliser(requete)
+        if not prefixe:
+            return []
+        meilleur_rang: Dict[int, int] = {}
+        position = bisect.bisect_left(self.cles, prefixe)
+        while position < len(self.cles) and self.cles[position].startswith(prefixe):
+            index = self.index_entrees[position]
+            rang = NOM_EXACT if self.noms[index] == prefixe else self.rangs[position]
+            if rang < meilleur_rang.get(index, LIGNE + 1):
+                meilleur_rang[index] = rang
+            position += 1
+        for index in self.par_ligne.get(prefixe, []):
+            meilleur_rang.setdefault(index, LIGNE)
+
+        meilleurs = heapq.nsmallest(limite, meilleur_rang.items(),
+                                    key=lambda item: (item[1], len(self.noms[item[0]]), self.noms[item[0]]))
+        return [self.entrees[index] for index, _ in meilleurs]
@@ -0,0 +1,136 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# Compteurs, jauges et histogrammes en mémoire, exportés au format texte de Prometheus
+
+# bornes des histogrammes de durée, en secondes
+BORNES_DUREE = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogramme:
+    def __init__(self, bornes: Tuple[float, ...]):
+        self.bornes = bornes
+        # une case par borne, plus une pour +Inf ; non cumulées (cumulées à l'export)
+        self.cases = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur: float) -> None:
+        self.cases[bisect.bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+
+def echapper(valeur: str) -> str:
+    return valeur.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def formater_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{nom}="{echapper(valeur)}"' for nom, valeur in labels) + "}"
+
+
+def formater_nombre(valeur: float) -> str:
+    if valeur == float("inf"):
+        return "+Inf"
+    if float(valeur).is_integer():
+        return str(int(valeur))
+    return repr(float(valeur))
+
+
+class Registre:
+    def __init__(self):
+        self.verrou = threading.Lock()
+        # nom -> (type, aide)
+        self.descriptions: Dict[str, Tuple[str, str]] = {}
+        self.compteurs: Dict[str, Dict[Labels, float]] = {}
+        self.histogrammes: Dict[str, Dict[Labels, Histogramme]] = {}
+        # jauges calculées au moment de l'export : nom -> fonction renvoyant {labels: valeur}
+        self.jauges: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+
+    def decrire(self, nom: str, type_metrique: str, aide: str) -> None:
+        self.descriptions[nom] = (type_metrique, aide)
+
+    def incrementer(self, nom: str, valeur: float = 1, **labels: str) -> None:
+        cle = tuple(sorted(labels.items()))
+        with self.verrou:
+            serie = self.compteurs.setdefault(nom, {})
+            serie[cle] = serie.get(cle, 0) + valeur
+
+    def observer(self, nom: str, valeur: float, **labels: str) -> None:
+        cle = tuple(sorted(labels.items()))
+        with self.verrou:
+            serie = self.histogrammes.setdefault(nom, {})
+            histogramme = serie.get(cle)
+            if histogramme is None:
+                histogramme = serie[cle] = Histogramme(BORNES_DUREE)
+            histogramme.observer(valeur)
+
+    def jauge(self, nom: str, fonction: Callable[[], Dict[Labels, float]]) -> None:
+        self.jauges[nom] = fonction
+
+    @contextmanager
+    def mesurer(self, nom: str, **labels: str) -> Iterator[None]:
+        # durée du bloc, en secondes, ajoutée à l'histogramme nom{labels}
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(nom, time.perf_counter() - debut, **labels)
+
+    def instrumenter(self, route: str) -> Callable:
+        # décorateur de vue Flask : nombre de requêtes, exceptions et durée totale par route
+        def decorateur(vue: Callable) -> Callable:
+            @functools.wraps(vue)
+            def enveloppe(*args, **kwargs):
+                debut = time.perf_counter()
+                try:
+                    return vue(*args, **kwargs)
+                except Exception:
+                    self.incrementer("metro_erreurs_total", route=route, type="exception")
+                    raise
+                finally:
+                    self.incrementer("metro_requetes_total", route=route)
+                    self.observer("metro_requete_duree_secondes", time.perf_counter() - debut, route=route)
+            return enveloppe
+        return decorateur
+
+    def exporter(self) -> str:
+        lignes: List[str] = []
+
+        def en_tete(nom: str, type_par_defaut: str) -> None:
+            type_metrique, aide = self.descriptions.get(nom, (type_par_defaut, ""))
+            if aide:
+                lignes.append(f"# HELP {nom} {aide}")
+            lignes.append(f"# TYPE {nom} {type_metrique}")
+
+        with self.verrou:
+            for nom, serie in sorted(self.compteurs.items()):
+                en_tete(nom, "counter")
+                for labels, valeur in sorted(serie.items()):
+                    lignes.append(f"{nom}{formater_labels(labels)} {formater_nombre(valeur)}")
+
+            for nom, serie in sorted(self.histogrammes.items()):
+                en_tete(nom, "histogram")
+                for labels, histogramme in sorted(serie.items()):
+                    cumul = 0
+                    for borne, nombre in zip(histogramme.bornes + (float("inf"),), histogramme.cases):
+                        cumul += nombre
+                        labels_case = labels + (("le", formater_nombre(borne)),)
+                        lignes.append(f"{nom}_bucket{formater_labels(labels_case)} {cumul}")
+                    lignes.append(f"{nom}_sum{formater_labels(labels)} {formater_nombre(histogramme.somme)}")
+                    lignes.append(f"{nom}_count{formater_labels(labels)} {histogramme.nombre}")
+
+        for nom, fonction in sorted(self.jauges.items()):
+            en_tete(nom, "gauge")
+            for labels, valeur in sorted(fonction().items()):
+                lignes.append(f"{nom}{formater_labels(labels)} {formater_nombre(valeur)}")
+
+        return "\n".join(lignes) + "\n"
@@ -0,0 +1,291 @@
+import heapq
+import json
+import math
+import os
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterator, List, Mapping, Optional, Set, Tuple, TYPE_CHECKING
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : pas de verrou entre processus, le serveur de développement n'en a qu'un
+    fcntl = None
+
+if TYPE_CHECKING:
+    from graphe import Graphe, Station
+    from precalcul import TableRoutes
+
+# Fermetures de stations et d'arêtes, temps de parcours modifiés : appliqués au graphe de référence
+# (celui de metro.txt) pour donner un nouveau graphe servi à la place, sans redémarrer.
+# Fichier (Data/perturbations.json) : {"stations_fermees": [id, ...], "aretes_fermees": [[id, id], ...],
+#                                      "temps": [[id, id, secondes], ...]}
+
+INFINI = float("inf")
+
+
+def cle_arete(id_1: int, id_2: int) -> Tuple[int, int]:
+    # les arêtes ne sont pas orientées
+    return (id_1, id_2) if id_1 <= id_2 else (id_2, id_1)
+
+
+@dataclass(frozen=True)
+class Perturbations:
+    # plus aucune arête n'entre dans une station fermée ni n'en sort
+    stations_fermees: FrozenSet[int] = frozenset()
+    aretes_fermees: FrozenSet[Tuple[int, int]] = frozenset()
+    # cle_arete -> temps remplaçant celui de metro.txt, dans les deux sens
+    temps: Mapping[Tuple[int, int], int] = field(default_factory=lambda: MappingProxyType({}))
+
+    def vide(self) -> bool:
+        return not (self.stations_fermees or self.aretes_fermees or self.temps)
+
+    def poids(self, id_1: int, id_2: int, poids: int) -> float:
+        # poids de l'arc id_1 -> id_2 une fois les perturbations appliquées, INFINI s'il est fermé
+        if id_1 in self.stations_fermees or id_2 in self.stations_fermees:
+            return INFINI
+        cle = cle_arete(id_1, id_2)
+        if cle in self.aretes_fermees:
+            return INFINI
+        return self.temps.get(cle, poids)
+
+    def vers_json(self) -> Dict:
+        return {
+            "stations_fermees": sorted(self.stations_fermees),
+            "aretes_fermees": [list(arete) for arete in sorted(self.aretes_fermees)],
+            "temps": [[id_1, id_2, temps] for (id_1, id_2), temps in sorted(self.temps.items())],
+        }
+
+
+def perturbations_depuis_json(donnees: Dict) -> Perturbations:
+    return Perturbations(
+        frozenset(int(station_id) for station_id in donnees.get("stations_fermees", ())),
+        frozenset(cle_arete(int(id_1), int(id_2)) for id_1, id_2 in donnees.get("aretes_fermees", ())),
+        MappingProxyType({cle_arete(int(id_1), int(id_2)): int(temps) for id_1, id_2, temps in donnees.get("temps", ())}),
+    )
+
+
+def lire_perturbations(file_path: str) -> Perturbations:
+    # aucune perturbation si le fichier est absent ou illisible
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            return perturbations_depuis_json(json.load(file))
+    except FileNotFoundError:
+        return Perturbations()
+    except (ValueError, TypeError, AttributeError) as erreur:
+        print(f"Perturbations ignorées, fichier invalide : {file_path} ({erreur})")
+        return Perturbations()
+
+
+def ecrire_perturbations(file_path: str, perturbations: Perturbations) -> None:
+    # écrit à côté puis renommé : les autres processus ne lisent jamais un fichier à moitié écrit
+    fichier_temporaire = f"{file_path}.{os.getpid()}.tmp"
+    with open(fichier_temporaire, "w", encoding="utf-8") as file:
+        json.dump(perturbations.vers_json(), file, ensure_ascii=False, indent=4)
+    os.replace(fichier_temporaire, file_path)
+
+
+@contextmanager
+def verrou_fichier(file_path: str) -> Iterator[None]:
+    # verrou exclusif entre processus autour d'une lecture-modification-écriture de file_path. Il porte sur
+    # un fichier .lock à côté : file_path lui-même est remplacé (os.replace) à chaque écriture.
+    if fcntl is None:
+        yield
+        return
+    with open(f"{file_path}.lock", "a") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def aretes_du_graphe(graphe: "Graphe") -> Set[Tuple[int, int]]:
+    return {
+        cle_arete(graphe.ids[index], graphe.ids[graphe.voisins[k]])
+        for index in range(graphe.nombre_stations())
+        for k in range(graphe.debut_voisins[index], graphe.debut_voisins[index + 1])
+    }
+
+
+def perturbations_valides(graphe: "Graphe", perturbations: Perturbations) -> Perturbations:
+    # ne garde que les stations et arêtes qui existent dans graphe (après un rechargement de metro.txt par exemple)
+    aretes = aretes_du_graphe(graphe)
+    return Perturbations(
+        frozenset(station_id for station_id in perturbations.stations_fermees if station_id in graphe.index_par_id),
+        frozenset(arete for arete in perturbations.aretes_fermees if arete in aretes),
+        MappingProxyType({arete: temps for arete, temps in perturbations.temps.items() if arete in aretes}),
+    )
+
+
+def appliquer_perturbations(reference: "Graphe", perturbations: Perturbations) -> "Graphe":
+    # Nouveau format CSR sans les arcs fermés ; stations, index et positions sont ceux du graphe de référence.
+    # Les Station.voisins ne servent qu'à la construction et ne sont pas recopiés.
+    debut_voisins = array("i", [0])
+    voisins = array("i")
+    poids = array("i")
+    facteur_heuristique = reference.facteur_heuristique
+    for index in range(reference.nombre_stations()):
+        for k in range(reference.debut_voisins[index], reference.debut_voisins[index + 1]):
+            index_voisin = reference.voisins[k]
+            nouveau_poids = perturbations.poids(reference.ids[index], reference.ids[index_voisin], reference.poids[k])
+            if nouveau_poids == INFINI:
+                continue
+            if nouveau_poids < reference.poids[k] and facteur_heuristique > 0:
+                # un temps raccourci peut rendre l'heuristique A* trop optimiste
+                distance = math.hypot(reference.pos_x[index] - reference.pos_x[index_voisin],
+                                      reference.pos_y[index] - reference.pos_y[index_voisin])
+                if distance > 0:
+                    facteur_heuristique = min(facteur_heuristique, nouveau_poids / distance)
+            voisins.append(index_voisin)
+            poids.append(nouveau_poids)
+        debut_voisins.append(len(voisins))
+
+    return replace(
+        reference,
+        debut_voisins=memoryview(debut_voisins).toreadonly(),
+        voisins=memoryview(voisins).toreadonly(),
+        poids=memoryview(poids).toreadonly(),
+        facteur_heuristique=facteur_heuristique,
+        directions={},
+        reference=reference,
+    )
+
+
+def poids_des_arcs(graphe: "Graphe") -> Dict[Tuple[int, int], int]:
+    # (index, index voisin) -> plus petit poids entre les deux
+    arcs: Dict[Tuple[int, int], int] = {}
+    for index in range(graphe.nombre_stations()):
+        for k in range(graphe.debut_voisins[index], graphe.debut_voisins[index + 1]):
+            arc = (index, graphe.voisins[k])
+            if arc not in arcs or graphe.poids[k] < arcs[arc]:
+                arcs[arc] = graphe.poids[k]
+    return arcs
+
+
+def arcs_modifies(ancien: "Graphe", nouveau: "Graphe") -> Dict[Tuple[int, int], Tuple[float, float]]:
+    # (index, index voisin) -> (ancien poids, nouveau poids), INFINI pour un arc absent ; mêmes stations des deux côtés
+    arcs_ancien = poids_des_arcs(ancien)
+    arcs_nouveau = poids_des_arcs(nouveau)
+    modifies = {}
+    for arc in arcs_ancien.keys() | arcs_nouveau.keys():
+        avant = arcs_ancien.get(arc, INFINI)
+        apres = arcs_nouveau.get(arc, INFINI)
+        if avant != apres:
+            modifies[arc] = (avant, apres)
+    return modifies
+
+
+def reparer_arbre(graphe: "Graphe", temps: List[float], precedent: List[int],
+                  modifies: Dict[Tuple[int, int], Tuple[float, float]]) -> None:
+    # Répare en place un arbre des plus courts chemins (temps, index provenance), exact avant les modifications,
+    # pour qu'il le soit sur graphe. Seules sont retraitées les stations dont le chemin empruntait un arc
+    # rallongé ou fermé (le sous-arbre sous cet arc) et celles qu'un arc raccourci améliore.
+    racines = [v for (u, v), (avant, apres) in modifies.items() if apres > avant and precedent[v] == u]
+    touchees: Set[int] = set()
+    if racines:
+        enfants: Dict[int, List[int]] = {}
+        for index, index_precedent in enumerate(precedent):
+            if index_precedent != -1:
+                enfants.setdefault(index_precedent, []).append(index)
+        a_traiter = racines
+        while a_traiter:
+            index = a_traiter.pop()
+            if index in touchees:
+                continue
+            touchees.add(index)
+            a_traiter.extend(enfants.get(index, ()))
+
+    tas: List[Tuple[float, int]] = []
+    for index in touchees:
+        temps[index] = INFINI
+        precedent[index] = -1
+    # meilleure entrée depuis une station non touchée (le graphe est non orienté : arcs entrants = arcs sortants)
+    for index in touchees:
+        for k in range(graphe.debut_voisins[index], graphe.debut_voisins[index + 1]):
+            index_voisin = graphe.voisins[k]
+            if index_voisin not in touchees and temps[index_voisin] + graphe.poids[k] < temps[index]:
+                temps[index] = temps[index_voisin] + graphe.poids[k]
+                precedent[index] = index_voisin
+        if temps[index] != INFINI:
+            heapq.heappush(tas, (temps[index], index))
+    for (u, v), (avant, apres) in modifies.items():
+        if apres < avant and temps[u] + apres < temps[v]:
+            temps[v] = temps[u] + apres
+            precedent[v] = u
+            heapq.heappush(tas, (temps[v], v))
+
+    # Dijkstra limité aux stations dont le temps a changé
+    while tas:
+        temps_current, current = heapq.heappop(tas)
+        if temps_current > temps[current]:
+            continue
+        for k in range(graphe.debut_voisins[current], graphe.debut_voisins[current + 1]):
+            index_voisin = graphe.voisins[k]
+            nouveau_temps = temps_current + graphe.poids[k]
+            if nouveau_temps < temps[index_voisin]:
+                temps[index_voisin] = nouveau_temps
+                precedent[index_voisin] = current
+                heapq.heappush(tas, (nouveau_temps, index_voisin))
+
+
+class TableReparee:
+    # Table précalculée du graphe de référence (precalcul.py) servie pour le graphe perturbé : une ligne
+    # (station de départ) qu'aucun arc modifié ne concerne est lue telle quelle, les autres sont réparées
+    # par reparer_arbre à la première demande, puis gardées
+    def __init__(self, table: "TableRoutes", graphe: "Graphe", modifies: Dict[Tuple[int, int], Tuple[float, float]]):
+        self.table = table
+        self.graphe = graphe
+        self.modifies = modifies
+        self.lignes_touchees = self.calcul_lignes_touchees()
+        # index de départ -> (temps, precedent) réparés ; au pire autant de lignes que la table
+        self.reparees: Dict[int, Tuple[List[float], List[int]]] = {}
+
+    def calcul_lignes_touchees(self) -> Set[int]:
+        n = self.table.n
+        temps, precedent = self.table.temps, self.table.precedent
+        touchees = set()
+        for depart in range(n):
+            ligne = depart * n
+            for (u, v), (avant, apres) in self.modifies.items():
+                if apres > avant:
+                    # arc rallongé ou fermé emprunté par l'arbre de ce départ
+                    if precedent[ligne + v] == u:
+                        touchees.add(depart)
+                        break
+                elif temps[ligne + u] >= 0 and (temps[ligne + v] < 0 or temps[ligne + u] + apres < temps[ligne + v]):
+                    # arc raccourci ou rouvert qui améliore un temps
+                    touchees.add(depart)
+                    break
+        return touchees
+
+    def arbre(self, index_depart: int) -> Tuple[List[float], List[int]]:
+        arbre = self.reparees.get(index_depart)
+        if arbre is None:
+            n = self.table.n
+            ligne = index_depart * n
+            temps = [INFINI if t < 0 else t for t in self.table.temps[ligne:ligne + n]]
+            precedent = list(self.table.precedent[ligne:ligne + n])
+            reparer_arbre(self.graphe, temps, precedent, self.modifies)
+            # deux requêtes simultanées peuvent réparer la même ligne : même résultat, la dernière l'emporte
+            arbre = self.reparees[index_depart] = (temps, precedent)
+        return arbre
+
+    def chemin(self, graphe: "Graphe", depart: "Station", arrivee: "Station") -> Optional[Dict[int, Tuple[int, int]]]:
+        # même format que TableRoutes.chemin
+        index_depart = graphe.index_par_id[depart.id]
+        if index_depart not in self.lignes_touchees:
+            return self.table.chemin(graphe, depart, arrivee)
+        stations: Dict[int, Tuple[int, int]] = {}
+        if depart.id == arrivee.id:
+            return stations
+        temps, precedent = self.arbre(index_depart)
+        current = graphe.index_par_id[arrivee.id]
+        if temps[current] == INFINI:
+            return None
+        while current != index_depart:
+            stations[graphe.ids[current]] = (graphe.ids[precedent[current]], temps[current])
+            current = precedent[current]
+        return stations
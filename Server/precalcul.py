@@ -0,0 +1,99 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graphe import Graphe, Station
+
+# Fichier : en-tête puis deux matrices n x n d'entiers 32 bits little-endian
+#   temps[depart * n + arrivee]      temps du plus court chemin, -1 si inaccessible
+#   precedent[depart * n + arrivee]  index de la station précédente sur ce chemin, -1 pour le départ
+MAGIQUE = b"RTAB"
+VERSION = 1
+EN_TETE = struct.Struct("<4sIII")  # magique, version, nombre de stations, empreinte du graphe
+
+
+@dataclass
+class TableRoutes:
+    fichier_mmap: mmap.mmap
+    n: int
+    temps: memoryview
+    precedent: memoryview
+
+    def chemin(self, graphe: "Graphe", depart: "Station", arrivee: "Station") -> Optional[Dict[int, Tuple[int, int]]]:
+        # Même format que dijkstra() : id station -> (id provenance, temps depuis le départ), limité au trajet
+        stations: Dict[int, Tuple[int, int]] = {}
+        if depart.id == arrivee.id:
+            return stations
+        index_depart = graphe.index_par_id[depart.id]
+        current = graphe.index_par_id[arrivee.id]
+        ligne = index_depart * self.n
+        if self.temps[ligne + current] < 0:
+            return None
+        while current != index_depart:
+            precedent = self.precedent[ligne + current]
+            stations[graphe.ids[current]] = (graphe.ids[precedent], self.temps[ligne + current])
+            current = precedent
+        return stations
+
+
+def ecrire_table_routes(graphe: "Graphe", file_path: str) -> None:
+    n = graphe.nombre_stations()
+    temps = array("i")
+    precedent = array("i")
+    # un Dijkstra complet par station de départ
+    for index_depart in range(n):
+        temps_depart, precedent_depart = graphe.plus_courts_chemins(index_depart)
+        temps.extend(-1 if t == float("inf") else int(t) for t in temps_depart)
+        precedent.extend(precedent_depart)
+
+    if sys.byteorder != "little":
+        temps.byteswap()
+        precedent.byteswap()
+    # écrit à côté puis renommé : les serveurs qui projettent l'ancienne table en mémoire la gardent intacte
+    fichier_temporaire = f"{file_path}.{os.getpid()}.tmp"
+    with open(fichier_temporaire, "wb") as file:
+        file.write(EN_TETE.pack(MAGIQUE, VERSION, n, graphe.empreinte()))
+        temps.tofile(file)
+        precedent.tofile(file)
+    os.replace(fichier_temporaire, file_path)
+    print(f"Table des routes sauvegardée sous {file_path} ({n} stations)")
+
+
+def charger_table_routes(file_path: str, graphe: "Graphe") -> Optional[TableRoutes]:
+    # Projette le fichier en mémoire (pages partagées entre processus) ; None si absent ou périmé
+    if sys.byteorder != "little":
+        return None
+    try:
+        with open(file_path, "rb") as file:
+            fichier_mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    n = graphe.nombre_stations()
+    taille_matrice = n * n * 4
+    if len(fichier_mmap) != EN_TETE.size + 2 * taille_matrice:
+        fichier_mmap.close()
+        return None
+    magique, version, n_fichier, empreinte = EN_TETE.unpack_from(fichier_mmap, 0)
+    if magique != MAGIQUE or version != VERSION or n_fichier != n or empreinte != graphe.empreinte():
+        print(f"Table des routes périmée, ignorée : {file_path}")
+        fichier_mmap.close()
+        return None
+
+    vue = memoryview(fichier_mmap)
+    temps = vue[EN_TETE.size:EN_TETE.size + taille_matrice].cast("i")
+    precedent = vue[EN_TETE.size + taille_matrice:].cast("i")
+    return TableRoutes(fichier_mmap, n, temps, precedent)
+
+
+if __name__ == '__main__':
+    import graphe
+
+    reseau = graphe.instantane.reseau
+    # table du graphe de metro.txt, pas d'une version perturbée : c'est celle que charger_table_routes attend
+    ecrire_table_routes(reseau.reference or reseau, graphe.FICHIER_ROUTES)
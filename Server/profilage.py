@@ -0,0 +1,186 @@
+import cProfile
+import functools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import make_response, request
+
+# Profilage à la demande d'une requête, écrit dans un anneau de fichiers sur disque pour analyse hors ligne.
+# Une requête est profilée au hasard avec la probabilité taux, ou si elle porte l'en-tête X-Profil: 1 et que
+# le serveur accepte cet en-tête (entete) : sans cela, n'importe quel client pourrait ralentir ses requêtes
+# et chasser de l'anneau les profils utiles. Sinon, le décorateur ne coûte qu'un test. Formats :
+#   "collapsed" : une ligne "appelant;...;appelé microsecondes" par pile (flamegraph.pl, speedscope, inferno)
+#   "pstats"    : fichier de cProfile (python -m pstats, snakeviz) ; un seul à la fois par processus, et à partir
+#                 de Python 3.12 il compte aussi le travail des autres threads pendant la requête
+
+ENTETE = "X-Profil"
+FORMATS = {"collapsed": "folded", "pstats": "prof"}
+
+
+def nom_fonction(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+def nom_fonction_c(fonction) -> str:
+    module = getattr(fonction, "__module__", None) or type(getattr(fonction, "__self__", None)).__name__
+    return f"{module}.{getattr(fonction, '__qualname__', repr(fonction))}"
+
+
+class PilesAppels:
+    # Profil déterministe par pile complète : le temps écoulé entre deux événements de sys.setprofile
+    # est attribué à la pile d'appels en cours (temps propre de la fonction au sommet)
+    def __init__(self):
+        self.pile: List[str] = []
+        self.temps: Dict[Tuple[str, ...], float] = {}
+        self.dernier = 0.0
+
+    def __call__(self, frame, evenement: str, argument) -> None:
+        maintenant = time.perf_counter()
+        if self.pile:
+            cle = tuple(self.pile)
+            self.temps[cle] = self.temps.get(cle, 0.0) + maintenant - self.dernier
+        if evenement == "call":
+            self.pile.append(nom_fonction(frame.f_code))
+        elif evenement == "c_call":
+            self.pile.append(nom_fonction_c(argument))
+        elif self.pile:
+            # return, c_return, c_exception
+            self.pile.pop()
+        self.dernier = time.perf_counter()
+
+    def executer(self, fonction: Callable):
+        self.dernier = time.perf_counter()
+        sys.setprofile(self)
+        try:
+            return fonction()
+        finally:
+            sys.setprofile(None)
+
+    def lignes(self) -> str:
+        return "".join(f"{';'.join(pile)} {round(duree * 1e6)}\n"
+                       for pile, duree in sorted(self.temps.items()) if round(duree * 1e6) > 0)
+
+
+class Profileur:
+    def __init__(self, dossier: str, taux: float = 0.0, entete: bool = False, max_fichiers: int = 50,
+                 format_sortie: str = "collapsed"):
+        if format_sortie not in FORMATS:
+            raise ValueError(f"format de profil inconnu : {format_sortie}")
+        self.dossier = dossier
+        self.taux = taux
+        self.entete = entete
+        # taille de l'anneau : au-delà, les profils les plus anciens sont supprimés
+        self.max_fichiers = max_fichiers
+        self.format_sortie = format_sortie
+        self.verrou = threading.Lock()
+        # cProfile (Python 3.12 et plus) passe par sys.monitoring, commun à tout le processus : un seul profil
+        # pstats à la fois, les requêtes qui arrivent pendant ce temps ne sont pas profilées
+        self.verrou_pstats = threading.Lock()
+        self.local = threading.local()
+
+    def demande(self) -> bool:
+        if self.entete and request.headers.get(ENTETE) == "1":
+            return True
+        return self.taux > 0 and random.random() < self.taux
+
+    def en_cours(self) -> bool:
+        # vrai pendant une requête profilée (la vue peut alors ignorer son cache)
+        return getattr(self.local, "actif", False)
+
+    def profiler(self, route: str) -> Callable:
+        # décorateur de vue Flask ; le nom du fichier écrit est renvoyé dans l'en-tête X-Profil
+        def decorateur(vue: Callable) -> Callable:
+            @functools.wraps(vue)
+            def enveloppe(*args, **kwargs):
+                if not self.demande():
+                    return vue(*args, **kwargs)
+                self.local.actif = True
+                try:
+                    reponse, nom = self.executer(route, lambda: vue(*args, **kwargs))
+                finally:
+                    self.local.actif = False
+                reponse = make_response(reponse)
+                if nom is not None:
+                    reponse.headers[ENTETE] = nom
+                return reponse
+            return enveloppe
+        return decorateur
+
+    def executer(self, route: str, fonction: Callable):
+        debut = time.perf_counter()
+        if self.format_sortie == "pstats":
+            if not self.verrou_pstats.acquire(blocking=False):
+                return fonction(), None
+            try:
+                profil = cProfile.Profile()
+                try:
+                    profil.enable()
+                except ValueError:
+                    # autre outil de profilage actif (débogueur, couverture) : requête servie sans profil
+                    return fonction(), None
+                try:
+                    resultat = fonction()
+                finally:
+                    profil.disable()
+            finally:
+                self.verrou_pstats.release()
+        else:
+            profil = PilesAppels()
+            resultat = profil.executer(fonction)
+        duree = time.perf_counter() - debut
+        try:
+            nom = self.ecrire(route, duree, profil)
+        except OSError as erreur:
+            # un profil perdu ne fait pas échouer la requête
+            print(f"Profil non écrit : {erreur}")
+            nom = None
+        return resultat, nom
+
+    def ecrire(self, route: str, duree: float, profil) -> str:
+        # horodatage, route, durée et paramètres dans le nom : le profil d'une paire lente se retrouve au nom
+        morceaux = [time.strftime("%Y%m%dT%H%M%S"), f"{time.time_ns() % 10**9:09d}", route, f"{round(duree * 1000)}ms"]
+        morceaux += [f"{cle}-{valeur}" for cle, valeur in sorted(request.args.items())]
+        nom = re.sub(r"[^0-9A-Za-z_.-]", "", "_".join(morceaux))[:150]
+        nom = f"{nom}.{FORMATS[self.format_sortie]}"
+        os.makedirs(self.dossier, exist_ok=True)
+        chemin = os.path.join(self.dossier, nom)
+        fichier_temporaire = f"{chemin}.{os.getpid()}.tmp"
+        if self.format_sortie == "pstats":
+            profil.dump_stats(fichier_temporaire)
+        else:
+            with open(fichier_temporaire, "w", encoding="utf-8") as file:
+                file.write(profil.lignes())
+        os.replace(fichier_temporaire, chemin)
+        self.elaguer()
+        return nom
+
+    def elaguer(self) -> None:
+        # anneau borné : ne garde que les max_fichiers profils les plus récents
+        with self.verrou:
+            fichiers: List[Tuple[float, str]] = []
+            for nom in os.listdir(self.dossier):
+                if nom.rsplit(".", 1)[-1] in FORMATS.values():
+                    chemin = os.path.join(self.dossier, nom)
+                    try:
+                        fichiers.append((os.stat(chemin).st_mtime_ns, chemin))
+                    except OSError:
+                        continue
+            fichiers.sort()
+            for _, chemin in fichiers[:max(0, len(fichiers) - self.max_fichiers)]:
+                try:
+                    os.remove(chemin)
+                except OSError:
+                    pass
+
+
+def lire_taux(valeur: Optional[str]) -> float:
+    # METRO_PROFIL_TAUX : probabilité entre 0 et 1, 0 si absente ou invalide
+    try:
+        return min(max(float(valeur or 0), 0.0), 1.0)
+    except ValueError:
+        return 0.0
@@ -0,0 +1,121 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graphe import Graphe
+
+# Fichier binaire du graphe déjà construit (connexité comprise), relu sans analyse du texte :
+#   en-tête, puis sections alignées sur 8 octets, little-endian
+#   pos_x, pos_y          n flottants 64 bits
+#   ids, debut_voisins    n et n + 1 entiers 32 bits
+#   voisins, poids        m entiers 32 bits
+#   stations              JSON [[id, nom, lignes, terminus], ...] dans l'ordre des index
+MAGIQUE = b"GRPH"
+VERSION = 1
+# magique, version, empreinte des fichiers source, somme de contrôle du contenu, n, m, taille du JSON, facteur heuristique
+EN_TETE = struct.Struct("<4sIIIIIId")
+
+
+def empreinte_sources(*file_paths: str) -> int:
+    # crc32 du contenu des fichiers texte : le snapshot est périmé dès que l'un d'eux change
+    empreinte = 0
+    for file_path in file_paths:
+        try:
+            with open(file_path, "rb") as file:
+                empreinte = zlib.crc32(file.read(), empreinte)
+        except FileNotFoundError:
+            pass
+    return empreinte
+
+
+def aligner(taille: int) -> int:
+    return (taille + 7) // 8 * 8
+
+
+def ecrire_snapshot(graphe: "Graphe", file_path: str, empreinte: int) -> None:
+    n = graphe.nombre_stations()
+    m = graphe.nombre_aretes()
+    meta = json.dumps(
+        [[station.id, station.name, station.lignes, station.terminus] for station in graphe.stations],
+        ensure_ascii=False
+    ).encode("utf-8")
+
+    sections: List[array] = [
+        array("d", graphe.pos_x), array("d", graphe.pos_y),
+        array("i", graphe.ids), array("i", graphe.debut_voisins),
+        array("i", graphe.voisins), array("i", graphe.poids),
+    ]
+    contenu = bytearray()
+    for section in sections:
+        if sys.byteorder != "little":
+            section.byteswap()
+        contenu += section.tobytes()
+        contenu += bytes(aligner(len(contenu)) - len(contenu))
+    contenu += meta
+
+    # écrit à côté puis renommé : un processus qui projette encore l'ancien fichier en mémoire le garde intact
+    fichier_temporaire = f"{file_path}.{os.getpid()}.tmp"
+    with open(fichier_temporaire, "wb") as file:
+        en_tete = EN_TETE.pack(MAGIQUE, VERSION, empreinte, zlib.crc32(contenu), n, m, len(meta),
+                               graphe.facteur_heuristique)
+        file.write(en_tete)
+        file.write(bytes(aligner(len(en_tete)) - len(en_tete)))
+        file.write(contenu)
+    os.replace(fichier_temporaire, file_path)
+    print(f"Snapshot du graphe sauvegardé sous {file_path} ({n} stations, {m} arcs)")
+
+
+def lire_snapshot(file_path: str, empreinte: int) -> Optional[Dict]:
+    # Tableaux projetés en mémoire sans copie ; None si absent, corrompu ou périmé
+    if sys.byteorder != "little":
+        return None
+    try:
+        with open(file_path, "rb") as file:
+            fichier_mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if len(fichier_mmap) < EN_TETE.size:
+        fichier_mmap.close()
+        return None
+    magique, version, empreinte_fichier, somme, n, m, taille_meta, facteur = EN_TETE.unpack_from(fichier_mmap, 0)
+    if magique != MAGIQUE or version != VERSION or empreinte_fichier != empreinte:
+        print(f"Snapshot du graphe périmé, ignoré : {file_path}")
+        fichier_mmap.close()
+        return None
+
+    vue = memoryview(fichier_mmap)
+    debut = aligner(EN_TETE.size)
+    if zlib.crc32(vue[debut:]) != somme:
+        print(f"Snapshot du graphe corrompu, ignoré : {file_path}")
+        vue.release()
+        fichier_mmap.close()
+        return None
+
+    contenu: Dict = {"facteur_heuristique": facteur}
+    for nom, format_section, taille in (
+        ("pos_x", "d", n), ("pos_y", "d", n),
+        ("ids", "i", n), ("debut_voisins", "i", n + 1),
+        ("voisins", "i", m), ("poids", "i", m),
+    ):
+        fin = debut + taille * struct.calcsize(format_section)
+        contenu[nom] = vue[debut:fin].cast(format_section)
+        debut = aligner(fin)
+    contenu["stations"] = json.loads(bytes(vue[debut:debut + taille_meta]).decode("utf-8"))
+    return contenu
+
+
+if __name__ == '__main__':
+    import graphe
+
+    ecrire_snapshot(
+        graphe.charger_depuis_texte(),
+        graphe.FICHIER_SNAPSHOT,
+        empreinte_sources(graphe.FICHIER_METRO, graphe.FICHIER_POSITIONS)
+    )
@@ -0,0 +1,88 @@
+import heapq
+import math
+from array import array
+from typing import List, Tuple
+
+# Grille uniforme sur les positions de la carte (pospoints.txt) pour /nearest.
+# Les points sont rangés par case au format CSR, comme les voisins de Graphe : la case c contient
+# points[debut_cases[c]:debut_cases[c + 1]].
+
+# nombre moyen de points par case visé
+POINTS_PAR_CASE = 2
+
+
+class GrilleSpatiale:
+    def __init__(self, xs: List[float], ys: List[float]):
+        # xs[i], ys[i] : position du point i
+        self.xs = array("d", xs)
+        self.ys = array("d", ys)
+        n = len(self.xs)
+        if n == 0:
+            self.min_x = self.min_y = 0.0
+            self.taille_case = 1.0
+            self.nb_x = self.nb_y = 0
+            self.debut_cases = array("i", [0])
+            self.points = array("i")
+            return
+
+        self.min_x, self.min_y = min(self.xs), min(self.ys)
+        largeur = max(self.xs) - self.min_x
+        hauteur = max(self.ys) - self.min_y
+        # cases carrées, environ n / POINTS_PAR_CASE en tout
+        self.taille_case = math.sqrt(max(largeur * hauteur, 1.0) * POINTS_PAR_CASE / n) or 1.0
+        self.nb_x = int(largeur / self.taille_case) + 1
+        self.nb_y = int(hauteur / self.taille_case) + 1
+
+        cases = [self.case(self.xs[i], self.ys[i]) for i in range(n)]
+        compte = [0] * (self.nb_x * self.nb_y + 1)
+        for cx, cy in cases:
+            compte[cy * self.nb_x + cx + 1] += 1
+        for c in range(1, len(compte)):
+            compte[c] += compte[c - 1]
+        self.debut_cases = array("i", compte)
+        self.points = array("i", [0] * n)
+        suivant = compte[:-1]
+        for i, (cx, cy) in enumerate(cases):
+            c = cy * self.nb_x + cx
+            self.points[suivant[c]] = i
+            suivant[c] += 1
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def case(self, x: float, y: float) -> Tuple[int, int]:
+        # case contenant (x, y) ; hors de la grille pour un point hors de l'emprise des points
+        return int(math.floor((x - self.min_x) / self.taille_case)), int(math.floor((y - self.min_y) / self.taille_case))
+
+    def plus_proches(self, x: float, y: float, k: int) -> List[Tuple[float, int]]:
+        # (distance, point) des k points les plus proches de (x, y), par distance croissante
+        # parcours des anneaux de cases autour de celle de (x, y) : un point de l'anneau r est à plus de
+        # (r - 1) * taille_case, on s'arrête dès que le k-ième meilleur est plus près que ça
+        if k <= 0 or len(self) == 0:
+            return []
+        cx, cy = self.case(x, y)
+        # anneau au-delà duquel il n'y a plus aucune case
+        r_max = max(cx, self.nb_x - 1 - cx, cy, self.nb_y - 1 - cy)
+        # tas max (distance négative) des k meilleurs
+        meilleurs: List[Tuple[float, int]] = []
+        r = max(0, -cx, cx - self.nb_x + 1, -cy, cy - self.nb_y + 1)
+        while r <= r_max:
+            if len(meilleurs) == k and -meilleurs[0][0] < (r - 1) * self.taille_case:
+                break
+            for y_case in range(max(cy - r, 0), min(cy + r, self.nb_y - 1) + 1):
+                # lignes du bord : toutes les cases ; sinon les deux cases des côtés
+                if y_case in (cy - r, cy + r):
+                    colonnes = range(max(cx - r, 0), min(cx + r, self.nb_x - 1) + 1)
+                else:
+                    colonnes = [c for c in (cx - r, cx + r) if 0 <= c < self.nb_x]
+                for x_case in colonnes:
+                    c = y_case * self.nb_x + x_case
+                    for j in range(self.debut_cases[c], self.debut_cases[c + 1]):
+                        point = self.points[j]
+                        distance = math.hypot(self.xs[point] - x, self.ys[point] - y)
+                        if len(meilleurs) < k:
+                            heapq.heappush(meilleurs, (-distance, -point))
+                        elif (-distance, -point) > meilleurs[0]:
+                            heapq.heapreplace(meilleurs, (-distance, -point))
+            r += 1
+        return sorted((-distance, -point) for distance, point in meilleurs)
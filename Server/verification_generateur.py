@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from generateur import ReseauSynthetique
+from graphe import EnsemblesDisjoints
+
+# Vérifie que les réseaux synthétiques de generateur.py sont connexes par eux-mêmes, sans les arêtes que
+# creer_connexite ajoute au chargement : sinon benchmark.py mesurerait un autre réseau que celui généré.
+#   python verification_generateur.py --graines 50 --tailles 4x6,16x24,40x10,64x32
+#       code de sortie 1 au premier réseau non connexe
+
+TAILLES = ["4x6", "16x24", "40x10", "64x32"]
+
+
+def nombre_composantes(reseau: ReseauSynthetique) -> int:
+    composantes = EnsemblesDisjoints(len(reseau.sommets))
+    nombre = len(reseau.sommets)
+    for arete in reseau.aretes_ligne + reseau.aretes_correspondance:
+        if composantes.unir(arete.id_1, arete.id_2):
+            nombre -= 1
+    return nombre
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vérification de la connexité des réseaux synthétiques")
+    parser.add_argument("--graines", type=int, default=50, help="graines vérifiées par taille")
+    parser.add_argument("--tailles", default=",".join(TAILLES),
+                        help="lignes x stations par ligne, séparés par des virgules")
+    args = parser.parse_args()
+
+    nb_reseaux = 0
+    for taille in filter(None, args.tailles.split(",")):
+        nb_lignes, stations_par_ligne = (int(valeur) for valeur in taille.split("x"))
+        for graine in range(args.graines):
+            reseau = ReseauSynthetique(nb_lignes, stations_par_ligne, graine).generer()
+            composantes = nombre_composantes(reseau)
+            nb_reseaux += 1
+            if composantes != 1:
+                print(f"réseau {taille}, graine {graine} : {composantes} composantes connexes")
+                sys.exit(1)
+    print(f"{nb_reseaux} réseaux synthétiques, tous connexes")
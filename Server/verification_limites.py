@@ -0,0 +1,48 @@
+import sys
+from typing import Callable, List, Tuple
+
+import graphe
+
+# Vérifie les limites d'entrée des routes qui calculent par lot : à la limite la réponse est servie,
+# au-delà la route répond "400" sans rien calculer.
+#   python verification_limites.py       code de sortie 1 si une limite n'est pas respectée
+
+
+def verifications(client) -> List[Tuple[str, Callable[[], object], object]]:
+    reseau = graphe.instantane.reseau
+    ids = list(reseau.index_par_id)
+
+    def liste_ids(nombre: int) -> str:
+        # ids répétés si le réseau en a moins que nombre : la limite porte sur la longueur de la liste
+        return ",".join(str(ids[index % len(ids)]) for index in range(nombre))
+
+    def matrice(nb_origines: int, nb_destinations: int):
+        return client.get(f"/matrix?origines={liste_ids(nb_origines)}"
+                          f"&destinations={liste_ids(nb_destinations)}").get_json()["status"]
+
+    def lot_dijkstra(nombre: int):
+        paires = [[ids[0], ids[1]]] * nombre
+        return client.post("/dijkstra/batch", json={"paires": paires}).get_json()["status"]
+
+    def lot_proches(nombre: int):
+        return client.post("/nearest/batch", json={"points": [[0, 0]] * nombre, "k": 1}).get_json()["status"]
+
+    return [
+        ("/matrix à la limite", lambda: matrice(graphe.MAX_ORIGINES_MATRICE, graphe.MAX_DESTINATIONS_MATRICE), 200),
+        ("/matrix, trop d'origines", lambda: matrice(graphe.MAX_ORIGINES_MATRICE + 1, 1), "400"),
+        ("/matrix, trop de destinations", lambda: matrice(1, graphe.MAX_DESTINATIONS_MATRICE + 1), "400"),
+        ("/dijkstra/batch, trop de paires", lambda: lot_dijkstra(graphe.MAX_PAIRES_BATCH + 1), "400"),
+        ("/nearest/batch, trop de points", lambda: lot_proches(graphe.MAX_POINTS_BATCH + 1), "400"),
+    ]
+
+
+if __name__ == '__main__':
+    client = graphe.app.test_client()
+    nb_echecs = 0
+    for nom, appel, attendu in verifications(client):
+        obtenu = appel()
+        if obtenu != attendu:
+            nb_echecs += 1
+            print(f"{nom} : status {obtenu!r}, attendu {attendu!r}")
+    print(f"{nb_echecs} limite(s) non respectée(s)" if nb_echecs else "limites respectées")
+    sys.exit(1 if nb_echecs else 0)
@@ -0,0 +1,119 @@
+import argparse
+import random
+import sys
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+import graphe
+from perturbations import (INFINI, Perturbations, TableReparee, aretes_du_graphe, appliquer_perturbations,
+                           arcs_modifies, reparer_arbre)
+from precalcul import charger_table_routes
+
+# Vérifie la réparation incrémentale des plus courts chemins (perturbations.py) contre un Dijkstra complet
+# sur des perturbations tirées au hasard : fermetures, réouvertures, temps rallongés ou raccourcis.
+#   python verification_perturbations.py --tirages 50 --departs 20 --graine 0
+#       code de sortie 1 au premier écart, avec le tirage en cause
+# Avec Data/routes.bin à jour, TableReparee (lignes de la table lues ou réparées) est vérifiée aussi.
+
+
+def perturbations_au_hasard(reference: graphe.Graphe, aretes: List[Tuple[int, int]],
+                            hasard: random.Random) -> Perturbations:
+    # quelques stations et arêtes fermées, quelques temps remplacés (plus longs ou plus courts)
+    return Perturbations(
+        frozenset(hasard.sample(reference.ids, hasard.randint(0, 3))),
+        frozenset(hasard.sample(aretes, hasard.randint(0, 5))),
+        MappingProxyType({arete: hasard.randint(1, 600) for arete in hasard.sample(aretes, hasard.randint(0, 6))}),
+    )
+
+
+def poids_minimal(reseau: graphe.Graphe, index: int, index_voisin: int) -> Optional[int]:
+    return min((poids for voisin, poids in reseau.voisins_de(index) if voisin == index_voisin), default=None)
+
+
+def ecart_arbre(reseau: graphe.Graphe, index_depart: int, temps: List[float], precedent: List[int]) -> Optional[str]:
+    # temps comparés à un Dijkstra complet ; provenances vérifiées arc par arc (elles diffèrent à égalité)
+    temps_attendus, _ = reseau.plus_courts_chemins(index_depart)
+    for index, temps_attendu in enumerate(temps_attendus):
+        if temps[index] != temps_attendu:
+            return f"station {reseau.ids[index]} : temps {temps[index]}, attendu {temps_attendu}"
+        if index == index_depart or temps_attendu == INFINI:
+            continue
+        poids = poids_minimal(reseau, precedent[index], index) if precedent[index] != -1 else None
+        if poids is None or temps[precedent[index]] + poids != temps[index]:
+            return f"station {reseau.ids[index]} : provenance {precedent[index]} incohérente"
+    return None
+
+
+def ecart_chemin(reseau: graphe.Graphe, chemin: Optional[Dict[int, Tuple[int, int]]],
+                 index_depart: int, index_arrivee: int) -> Optional[str]:
+    # chemin au format de TableRoutes.chemin : temps final et arcs comparés au graphe perturbé
+    temps_attendus, _ = reseau.plus_courts_chemins(index_depart)
+    attendu = temps_attendus[index_arrivee]
+    if chemin is None:
+        return None if attendu == INFINI else f"aucun chemin, attendu {attendu}"
+    station_id = reseau.ids[index_arrivee]
+    if chemin[station_id][1] != attendu:
+        return f"temps {chemin[station_id][1]}, attendu {attendu}"
+    while station_id in chemin:
+        id_precedent, temps = chemin[station_id]
+        temps_precedent = chemin[id_precedent][1] if id_precedent in chemin else 0
+        poids = poids_minimal(reseau, reseau.index_par_id[id_precedent], reseau.index_par_id[station_id])
+        if poids is None or temps_precedent + poids != temps:
+            return f"arc {id_precedent} -> {station_id} absent ou de mauvais poids"
+        station_id = id_precedent
+    return None
+
+
+def verifier(reference: graphe.Graphe, table, nb_tirages: int, nb_departs: int, graine: int) -> int:
+    hasard = random.Random(graine)
+    aretes = sorted(aretes_du_graphe(reference))
+    n = reference.nombre_stations()
+    nb_verifications = 0
+    for tirage in range(nb_tirages):
+        # d'un état perturbé (ou du graphe de metro.txt) à un autre : arcs fermés, rouverts, rallongés, raccourcis
+        avant = perturbations_au_hasard(reference, aretes, hasard) if tirage % 2 else Perturbations()
+        apres = perturbations_au_hasard(reference, aretes, hasard)
+        reseau_avant = appliquer_perturbations(reference, avant) if not avant.vide() else reference
+        reseau_apres = appliquer_perturbations(reference, apres)
+        modifies = arcs_modifies(reseau_avant, reseau_apres)
+        for index_depart in hasard.sample(range(n), min(nb_departs, n)):
+            temps, precedent = reseau_avant.plus_courts_chemins(index_depart)
+            reparer_arbre(reseau_apres, temps, precedent, modifies)
+            ecart = ecart_arbre(reseau_apres, index_depart, temps, precedent)
+            nb_verifications += 1
+            if ecart is not None:
+                print(f"reparer_arbre, tirage {tirage}, départ {reference.ids[index_depart]} : {ecart}")
+                print(f"  avant : {avant.vers_json()}\n  après : {apres.vers_json()}")
+                return 1
+
+        if table is None:
+            continue
+        table_reparee = TableReparee(table, reseau_apres, arcs_modifies(reference, reseau_apres))
+        for _ in range(nb_departs):
+            index_depart, index_arrivee = hasard.sample(range(n), 2)
+            chemin = table_reparee.chemin(reseau_apres, reference.stations[index_depart],
+                                          reference.stations[index_arrivee])
+            ecart = ecart_chemin(reseau_apres, chemin, index_depart, index_arrivee)
+            nb_verifications += 1
+            if ecart is not None:
+                print(f"TableReparee, tirage {tirage}, {reference.ids[index_depart]} -> "
+                      f"{reference.ids[index_arrivee]} : {ecart}")
+                print(f"  perturbations : {apres.vers_json()}")
+                return 1
+
+    print(f"{nb_tirages} tirages, {nb_verifications} vérifications : aucun écart"
+          + ("" if table is not None else " (TableReparee non vérifiée : pas de table à jour)"))
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vérification de la réparation des plus courts chemins")
+    parser.add_argument("--tirages", type=int, default=50, help="ensembles de perturbations tirés au hasard")
+    parser.add_argument("--departs", type=int, default=20, help="départs vérifiés par tirage")
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    reseau = graphe.instantane.reseau
+    reference = reseau.reference or reseau
+    sys.exit(verifier(reference, charger_table_routes(graphe.FICHIER_ROUTES, reference),
+                      args.tirages, args.departs, args.graine))